@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 """Command-line interface for Codebase Genius."""
+import argparse
 import sys
 import os
 from pathlib import Path
@@ -15,8 +16,6 @@ from codebase_genius.orchestrator import CodeGeniusOrchestrator
 
 def main():
     """Run the orchestrator from command line."""
-    import argparse
-
     parser = argparse.ArgumentParser(
         description="Generate documentation for a GitHub repository",
         formatter_class=argparse.RawDescriptionHelpFormatter,
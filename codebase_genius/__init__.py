@@ -1,8 +1,18 @@
 """Codebase Genius package initializer."""
 
+_ENV_LOADED = False
+
 
 def load_env():
-    """Load environment variables from .env file."""
+    """Load environment variables from .env file.
+
+    Every entry point calls this (and so do the modules they import), so
+    only the first call does any work.
+    """
+    global _ENV_LOADED
+    if _ENV_LOADED:
+        return
+    _ENV_LOADED = True
     try:
         from dotenv import load_dotenv
         load_dotenv()
@@ -4,24 +4,72 @@ Run it with:
     uvicorn codebase_genius.api_server:app --host 0.0.0.0 --port 8000
 """
 from __future__ import annotations
+import asyncio
 import os
+import threading
 import traceback
 import shutil
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
 
 from . import load_env
 load_env()
 
 from fastapi import FastAPI, HTTPException
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, Response, RedirectResponse
+from fastapi.responses import FileResponse, RedirectResponse
 from pathlib import Path
 from pydantic import BaseModel, HttpUrl
 from typing import Dict, Any, Union, Optional
-from .python_helpers.repo_tools import repo_map_workflow, validate_repo_url, find_important_files
-from .python_helpers.analyzer import analyze_files, discover_dependencies, list_python_files
+from .python_helpers.repo_tools import (
+    repo_map_workflow,
+    validate_repo_url,
+    find_important_files,
+    summarize_readme_in_background,
+)
+from .python_helpers.analyzer import (
+    analyze_files,
+    analyze_repo,
+    discover_dependencies,
+    list_python_files,
+)
 from .python_helpers.docgen import generate_markdown
 
-app = FastAPI(title="Codebase Genius", version="0.1.0")
+# Worker processes that run /generate pipelines (clone + CPU-heavy analysis).
+# Created at startup and replaced whenever a worker dies and breaks it.
+_POOL_WORKERS = int(os.getenv("CODEBASE_GENIUS_WORKERS", "4"))
+_process_pool: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+
+def _get_pool(broken: Optional[ProcessPoolExecutor] = None) -> ProcessPoolExecutor:
+    """The current worker pool, created if needed.
+
+    Pass the pool that just raised BrokenProcessPool to have it replaced
+    (unless a concurrent request already did).
+    """
+    global _process_pool
+    with _POOL_LOCK:
+        if _process_pool is None or _process_pool is broken:
+            if broken is not None:
+                broken.shutdown(wait=False, cancel_futures=True)
+            _process_pool = ProcessPoolExecutor(max_workers=_POOL_WORKERS)
+        return _process_pool
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    global _process_pool
+    _get_pool()
+    yield
+    with _POOL_LOCK:
+        pool, _process_pool = _process_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+app = FastAPI(title="Codebase Genius", version="0.1.0", lifespan=_lifespan)
 
 
 @app.get("/")
@@ -53,23 +101,60 @@ class ErrorResponse(BaseModel):
 
  
 @app.post("/generate", response_model=Union[GenerateResponse, ErrorResponse])
-def generate(req: GenerateRequest) -> Union[GenerateResponse, ErrorResponse]:
+async def generate(req: GenerateRequest) -> Union[GenerateResponse, ErrorResponse]:
     """Generate documentation for a repository.
 
     Returns a GenerateResponse on success, or an ErrorResponse with a friendly
     error_code/message if something goes wrong along the way.
+
+    The pipeline itself runs in a worker process, so a long clone/analysis
+    never blocks the event loop or the threads serving /health and /download.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        pool = _get_pool()
+        try:
+            result = await loop.run_in_executor(
+                pool, _run_generate, str(req.repo_url), req.analyze
+            )
+        except BrokenProcessPool:
+            # A worker died (OOM kill, crash in a native parser) and took the
+            # pool with it; start a fresh one and give the request one retry
+            traceback.print_exc()
+            result = await loop.run_in_executor(
+                _get_pool(broken=pool), _run_generate, str(req.repo_url), req.analyze
+            )
+    except Exception as e:
+        traceback.print_exc()
+        return ErrorResponse(
+            error_code="worker_failed",
+            message=str(e) or type(e).__name__,
+        )
+
+    if result["status"] == "ok":
+        return GenerateResponse(**result)
+    return ErrorResponse(**result)
+
+
+def _run_generate(repo_url: str, analyze: bool) -> Dict[str, Any]:
+    """Run the whole pipeline for one repository (inside a worker process).
+
+    Returns plain dicts, shaped like GenerateResponse or ErrorResponse, so
+    the result pickles cheaply back to the server process.
     """
     try:
         # Step 1: Validate URL
-        validation = validate_repo_url(str(req.repo_url))
+        validation = validate_repo_url(repo_url)
         if not validation["valid"]:
-            return ErrorResponse(
-                error_code="invalid_url",
-                message=validation["error"]
-            )
+            return {
+                "status": "error",
+                "error_code": "invalid_url",
+                "message": validation["error"],
+            }
         
         # Step 2: Map repository
-        info = repo_map_workflow(validation["normalized_url"])
+        # Summarize the README alongside the analysis rather than before it
+        info = repo_map_workflow(validation["normalized_url"], summarize=False)
         if info.get("error"):
             raw_err = info["error"]
             if ":" in raw_err:
@@ -78,27 +163,30 @@ def generate(req: GenerateRequest) -> Union[GenerateResponse, ErrorResponse]:
                 msg = msg.strip()
             else:
                 code, msg = "unknown_error", raw_err
-            return ErrorResponse(
-                error_code=code,
-                message=msg,
-                details={"repo_url": str(req.repo_url)},
-            )
+            return {
+                "status": "error",
+                "error_code": code,
+                "message": msg,
+                "details": {"repo_url": repo_url},
+            }
+        
+        wait_for_summary = summarize_readme_in_background(info["readme_text"])
         
         # Step 3: Find priority files
         priority_files = find_important_files(info["file_tree"])
         
         # Step 4: Analyze with iterative discovery
         ccg: Dict[str, Any]
-        if req.analyze:
+        if analyze:
             repo_path = info["repo_path"]
             priority_paths = [os.path.join(repo_path, f) for f in priority_files]
             if priority_paths:
                 ccg = analyze_files(priority_paths)
                 analyzed = set(priority_paths)
             else:
-                all_files = list_python_files(repo_path)
-                ccg = analyze_files(all_files)
-                analyzed = set(all_files)
+                # Whole-repo analysis is cached per commit
+                ccg = analyze_repo(repo_path)
+                analyzed = set(list_python_files(repo_path))
 
             # Iterative dependency discovery: analyze newly found internal
             # modules until no more remain or the iteration budget is hit.
@@ -117,6 +205,8 @@ def generate(req: GenerateRequest) -> Union[GenerateResponse, ErrorResponse]:
         else:
             ccg = {"nodes": [], "edges": []}
         
+        info["readme_summary"] = wait_for_summary()
+        
         # Step 5: Generate documentation  
         repo_name = os.path.basename(info["repo_path"]) or "repo"
         out_dir = os.path.join("outputs", repo_name)
@@ -128,22 +218,23 @@ def generate(req: GenerateRequest) -> Union[GenerateResponse, ErrorResponse]:
             out_dir,
         )
         
-        return GenerateResponse(
-            status="ok",
-            repo_path=info["repo_path"],
-            output_markdown=md_path,
-            readme_summary=info["readme_summary"],
-            symbol_count=len(ccg.get("nodes", [])),
-            file_tree_root=(info["file_tree"].get("path", ".") if info.get("file_tree") else "."),
-        )
+        return {
+            "status": "ok",
+            "repo_path": info["repo_path"],
+            "output_markdown": md_path,
+            "readme_summary": info["readme_summary"],
+            "symbol_count": len(ccg.get("nodes", [])),
+            "file_tree_root": (info["file_tree"].get("path", ".") if info.get("file_tree") else "."),
+        }
         
     except Exception as e:
         traceback.print_exc()
-        return ErrorResponse(
-            error_code="unhandled_exception",
-            message=str(e),
-            details={"trace": traceback.format_exc().splitlines()[-3:]},
-        )
+        return {
+            "status": "error",
+            "error_code": "unhandled_exception",
+            "message": str(e),
+            "details": {"trace": traceback.format_exc().splitlines()[-3:]},
+        }
 
  
 @app.get("/health")
@@ -152,7 +243,7 @@ def health():
 
 
 @app.get("/download/{repo_name}")
-def download_documentation(repo_name: str):
+async def download_documentation(repo_name: str):
     """Let the user download the generated docs as a Markdown file.
     
     Args:
@@ -181,7 +272,7 @@ def download_documentation(repo_name: str):
 
 
 @app.get("/download-content/{repo_name}")
-def download_documentation_content(repo_name: str):
+async def download_documentation_content(repo_name: str):
     """Return the documentation as plain text (for the frontend preview/copy).
 
     Args:
@@ -196,15 +287,10 @@ def download_documentation_content(repo_name: str):
             detail=f"Documentation not found for repository '{safe_repo_name}'"
         )
     
-    with open(docs_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    return Response(
-        content=content,
-        media_type="text/plain",
-        headers={
-            "Content-Type": "text/plain; charset=utf-8"
-        }
+    # Streamed from disk in chunks rather than read into one big string
+    return FileResponse(
+        path=str(docs_path),
+        media_type="text/plain; charset=utf-8",
     )
 
  
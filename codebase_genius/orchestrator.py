@@ -11,9 +11,11 @@ from .python_helpers.repo_tools import (
     validate_repo_url,
     repo_map_workflow,
     find_important_files,
+    summarize_readme_in_background,
 )
 from .python_helpers.analyzer import (
     analyze_files,
+    analyze_repo,
     discover_dependencies,
     aggregate_ccg_statistics,
     list_python_files,
@@ -69,7 +71,9 @@ class CodeGeniusOrchestrator:
 
         # Step 2: Map repository
         print("\n🗺️  Cloning the repo and mapping its structure...")
-        info = repo_map_workflow(normalized_url)
+        # The README summary is left for later so it can run alongside the
+        # code analysis below instead of ahead of it
+        info = repo_map_workflow(normalized_url, summarize=False)
         
         if info.get("error"):
             print(f"❌ Couldn't map the repository: {info['error']}")
@@ -79,6 +83,7 @@ class CodeGeniusOrchestrator:
                 "message": info["error"],
             }
 
+        wait_for_summary = summarize_readme_in_background(info["readme_text"])
         priority_files = find_important_files(info["file_tree"])
         print("✓ Repository ready")
         print(
@@ -99,12 +104,14 @@ class CodeGeniusOrchestrator:
                 ccg = analyze_files(priority_paths)
                 analyzed: set = set(priority_paths)
             else:
-                all_files = list_python_files(repo_path)
-                ccg = analyze_files(all_files)
-                analyzed = set(all_files)
+                # Whole-repo analysis is cached per commit
+                ccg = analyze_repo(repo_path)
+                analyzed = set(list_python_files(repo_path))
 
             iteration = 0
             total_discovered = 0
+            # Discovery result for the current ccg; reset whenever ccg grows
+            dependencies = None
 
             while iteration < self.max_iterations:
                 iteration += 1
@@ -128,22 +135,31 @@ class CodeGeniusOrchestrator:
                 total_discovered += len(new_files)
                 ccg = analyze_files(new_files, base_ccg=ccg)
                 analyzed.update(new_files)
+                dependencies = None
         else:
             ccg = {"nodes": [], "edges": []}
             iteration = 0
-            dependencies = {}
+            dependencies = None
 
-        # Get statistics
+        # Get statistics (reusing the last discovery pass if ccg hasn't
+        # changed since, instead of scanning every edge again)
         stats = aggregate_ccg_statistics(ccg)
-        final_dependencies = discover_dependencies(ccg, info["repo_path"])
-
-        print("✓ Code analysis finished:")
-        print(f"  - Symbols found: {stats['total_symbols']}")
-        print(f"  - Classes: {stats['classes']}")
-        print(f"  - Functions: {stats['functions']}")
-        print(f"  - Imports: {final_dependencies['total_imports']}")
-        print(f"  - External dependencies: {len(final_dependencies['external_dependencies'])}")
-        print(f"  - Discovery passes: {iteration}")
+        final_dependencies = dependencies
+        if final_dependencies is None:
+            final_dependencies = discover_dependencies(ccg, info["repo_path"])
+
+        # One write for the whole summary rather than one per line
+        print("\n".join([
+            "✓ Code analysis finished:",
+            f"  - Symbols found: {stats['total_symbols']}",
+            f"  - Classes: {stats['classes']}",
+            f"  - Functions: {stats['functions']}",
+            f"  - Imports: {final_dependencies['total_imports']}",
+            f"  - External dependencies: {len(final_dependencies['external_dependencies'])}",
+            f"  - Discovery passes: {iteration}",
+        ]))
+
+        info["readme_summary"] = wait_for_summary()
 
         # Step 4: Generate documentation
         print("\n📝 Writing the documentation...")
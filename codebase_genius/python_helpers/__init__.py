@@ -1 +1,12 @@
 """Python helper utilities for Codebase Genius."""
+import os
+
+# Everything kept between runs (clones, parse results, LLM answers) lives in
+# subdirectories of this, unless CODEBASE_GENIUS_CACHE_DIR says otherwise
+DEFAULT_CACHE_ROOT = os.path.join("~", ".cache", "codebase_genius")
+
+
+def cache_dir(name: str) -> str:
+    """Absolute path of the `name` cache, independent of the working directory."""
+    root = os.getenv("CODEBASE_GENIUS_CACHE_DIR") or DEFAULT_CACHE_ROOT
+    return os.path.join(os.path.abspath(os.path.expanduser(root)), name)
@@ -1,40 +1,147 @@
 """The analyzer: reads source code and builds a Code Context Graph (CCG).
 
-Uses Tree-sitter when it's available, and falls back to a simple line-based
-parser otherwise. The CCG is our internal map of the codebase — who defines
-what, and how the pieces reference each other.
+Uses Tree-sitter when it's available, and falls back to Python's built-in
+``ast`` parser otherwise. The CCG is our internal map of the codebase — who
+defines what, and how the pieces reference each other.
 """
 from __future__ import annotations
+import ast
+import functools
+import hashlib
+import importlib
+import importlib.util
 import os
 import json
-from pathlib import Path
-from typing import Dict, Any, List, Optional, Tuple
+import multiprocessing
+import pickle
+import re
+import subprocess
+import sys
+import time
+import warnings
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+from . import cache_dir
+
+# Optional Tree-sitter support (graceful fallback if unavailable). Only look
+# the package up here; it's imported on first use, so runs that never reach
+# the Tree-sitter path don't pay for loading grammars.
+_TS_PACKAGE = next(
+    (
+        name
+        for name in (
+            # Prebuilt grammars; successor of the discontinued tree_sitter_languages.
+            "tree_sitter_language_pack",
+            # Fallback for environments that still have the old package.
+            "tree_sitter_languages",
+        )
+        if importlib.util.find_spec(name) is not None
+    ),
+    None,
+)
+HAS_TREESITTER = _TS_PACKAGE is not None
 
-# Optional Tree-sitter support (graceful fallback if unavailable)
+# Optional fast JSON encoder for dumping CCGs
 try:
-    # Prebuilt grammars; successor of the discontinued tree_sitter_languages.
-    from tree_sitter_language_pack import get_parser  # type: ignore
-
-    HAS_TREESITTER = True
+    import orjson  # type: ignore
 except Exception:  # pragma: no cover - optional path
-    try:
-        # Fallback for environments that still have the old package.
-        from tree_sitter_languages import get_parser  # type: ignore
-
-        HAS_TREESITTER = True
-    except Exception:  # pragma: no cover - optional path
-        HAS_TREESITTER = False
+    orjson = None  # type: ignore
 
 SUPPORTED_EXT = {".py"}
 
-IGNORE_DIRS = {
+# Canonical edge types. Interned so the per-edge type checks compare by
+# identity first instead of walking the characters.
+EDGE_CALLS = sys.intern("calls")
+EDGE_INHERITS = sys.intern("inherits")
+EDGE_IMPORTS = sys.intern("imports")
+# Parser-internal tag for obj.method() calls on anything but self/cls. The
+# method could belong to any type, so these are never matched to a
+# definition in another file by name alone.
+_EDGE_ATTR_CALLS = sys.intern("attr_calls")
+
+# Directories never worth walking, wherever they appear. Shared with
+# repo_tools so the file tree and the analysis agree on what's skipped.
+IGNORE_DIRS = frozenset({
     ".git",
     "__pycache__",
     "node_modules",
     ".venv",
     "venv",
     ".mypy_cache",
-}
+    ".tox",
+})
+# Build output, skipped only at the top of the repo: deeper down these names
+# are just as likely to be real packages (e.g. pypa/build's src/build)
+TOP_LEVEL_IGNORE_DIRS = frozenset({"build", "dist"})
+
+# Parse results are cached on disk, keyed by a hash of each file's content.
+# Bump the version whenever the parsers change what they return.
+AST_CACHE_DIR = cache_dir("ast")
+_AST_CACHE_VERSION = 6
+# Once the cache grows past this, the oldest entries are pruned until it's
+# back under AST_CACHE_PRUNE_TO. Checking means a stat of every entry, so it
+# happens at most once per AST_CACHE_PRUNE_INTERVAL seconds.
+AST_CACHE_MAX_BYTES = 512 * 1024 * 1024
+AST_CACHE_PRUNE_TO = 384 * 1024 * 1024
+AST_CACHE_PRUNE_INTERVAL = 15 * 60
+# Touched whenever a prune check runs
+_AST_PRUNE_MARKER = ".last_prune"
+
+# Whole-repo CCGs from analyze_repo, one JSON file per checkout path, tagged
+# with the commit they were built from. Kept out of the analyzed repo, and
+# in JSON rather than pickle, so a checkout can't plant data we'd unpickle.
+CCG_CACHE_DIR = cache_dir("ccg")
+_CCG_CACHE_VERSION = 4
+
+# Source files bigger than this are almost always generated or vendored
+MAX_SOURCE_BYTES = 1_000_000
+_READ_BUFFER_BYTES = 128 * 1024
+
+# Below this many files we parse in-process instead of using worker processes
+_PARALLEL_MIN_FILES = 32
+# Parse workers are started fresh rather than forked: a fork copies whatever
+# the parent's other threads hold mid-flight (locks, open connections)
+_MP_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+# Common stdlib modules (used to tell stdlib imports from external deps)
+STDLIB_MODULES = frozenset({
+    "os", "sys", "re", "json", "time", "datetime", "collections",
+    "itertools", "functools", "pathlib", "typing", "abc", "enum",
+    "logging", "argparse", "configparser", "io", "shutil", "subprocess",
+    "threading", "multiprocessing", "asyncio", "contextlib", "traceback",
+    "unittest", "pytest", "math", "random", "string", "copy", "pickle",
+})
+
+# class/def/import lines, for the fallback scanner
+_SYMBOL_RE = re.compile(
+    r"^[ \t]*(?:"
+    r"class\s+(?P<cls>\w+)(?:\((?P<bases>[^)]*)\))?"
+    r"|(?:async\s+)?def\s+(?P<func>\w+)"
+    r"|import\s+(?P<imp>[\w.]+)"
+    r"|from\s+(?P<frm>[\w.]+)\s+import\b"
+    r")",
+    re.MULTILINE,
+)
+
+# Keywords the line-based fallback counts as branches
+_COMPLEXITY_RE = re.compile(r"\b(?:if|elif|for|while|and|or|except)\b")
+
+# Nodes that add a branch to a function's estimated complexity
+_BRANCH_NODES = (
+    ast.If,
+    ast.IfExp,
+    ast.For,
+    ast.AsyncFor,
+    ast.While,
+    ast.BoolOp,
+    ast.ExceptHandler,
+)
+
+# Nodes that open their own scope: what happens inside belongs to them
+_SCOPE_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)
 
 
 class CodeContextGraph:
@@ -44,6 +151,14 @@ class CodeContextGraph:
         self.nodes: Dict[str, Dict[str, Any]] = {}
         # Edge list items: {"source": key, "target": key, "type": str}
         self.edges: List[Dict[str, str]] = []
+        # Per-type views of self.edges, so queries and counts don't rescan
+        self.edges_by_type: Dict[str, List[Dict[str, str]]] = defaultdict(list)
+        self.type_counts: Counter = Counter()
+        # Name -> key of its definition (None when several files define it),
+        # and name -> indexes into self.edges of calls/inherits that found no
+        # definition yet, so later merges can still resolve them
+        self.symbol_table: Dict[str, Optional[str]] = {}
+        self.unresolved: Dict[str, List[int]] = defaultdict(list)
 
     def add_symbol(
         self, file_path: str, symbol_name: str, kind: str, **kwargs: Any
@@ -63,208 +178,557 @@ class CodeContextGraph:
 
     def add_edge(self, source: str, target: str, edge_type: str) -> None:
         """Record a relationship. Types: calls, inherits, imports, contains."""
-        self.edges.append({
+        edge = {
             "source": source,
             "target": target,
             "type": edge_type,
-        })
+        }
+        self.edges.append(edge)
+        self.edges_by_type[edge_type].append(edge)
+        self.type_counts[edge_type] += 1
+
+    def set_edges(self, edges: List[Dict[str, str]]) -> None:
+        """Replace all edges at once, rebuilding the per-type index."""
+        self.edges = list(edges)
+        self.edges_by_type = defaultdict(list)
+        for e in self.edges:
+            self.edges_by_type[e.get("type", "")].append(e)
+        self.type_counts = Counter(
+            {etype: len(items) for etype, items in self.edges_by_type.items()}
+        )
 
     def query_calls_to(self, target_symbol: str) -> List[str]:
         """Find all symbols that call target_symbol."""
         return [
             e["source"]
-            for e in self.edges
-            if e["type"] == "calls" and target_symbol in e["target"]
+            for e in self.edges_by_type.get(EDGE_CALLS, [])
+            if target_symbol in e["target"]
         ]
 
     def query_inherits_from(self, base_class: str) -> List[str]:
         """Find all classes that inherit from base_class."""
         return [
             e["source"]
-            for e in self.edges
-            if e["type"] == "inherits" and base_class in e["target"]
+            for e in self.edges_by_type.get(EDGE_INHERITS, [])
+            if base_class in e["target"]
         ]
 
     def to_dict(self) -> Dict[str, Any]:
+        nodes = list(self.nodes.values())
         return {
-            "nodes": list(self.nodes.values()),
+            "nodes": nodes,
             "edges": self.edges,
+            # Precomputed so aggregate_ccg_statistics needn't rescan the graph
+            "node_counts": dict(Counter(n["kind"] for n in nodes)),
+            "edge_counts": dict(self.type_counts),
+            # The same edge dicts grouped by type, so discover_dependencies
+            # can go straight to the imports. Internal: dumps_ccg leaves it out.
+            "_edges_by_type": dict(self.edges_by_type),
+            # Carried along for analyze_files(base_ccg=...); also internal
+            "_symbols": self.symbol_table,
+            "_unresolved": dict(self.unresolved),
         }
 
 
-def naive_parse(file_content: str) -> Tuple[List[Dict[str, Any]], List[Tuple[str, str, str]]]:
-    """Simple symbol finder: catches defs/classes/imports line by line.
+def naive_parse(
+    file_content: str,
+) -> Tuple[List[Dict[str, Any]], List[Tuple[Optional[str], str, str]]]:
+    """Find classes, functions, imports, and calls with Python's own parser.
+
+    Files that ``ast`` can't parse (Python 2 code, templates, ...) go through
+    the line-based scanner instead.
 
     Returns:
         symbols: list of symbol dicts
         edges: list of (source, target, edge_type) tuples
     """
+    symbols, edges = _naive_parse(file_content)
+    return symbols, [
+        (src, tgt, EDGE_CALLS if etype == _EDGE_ATTR_CALLS else etype)
+        for src, tgt, etype in edges
+    ]
+
+
+def _naive_parse(
+    file_content: str,
+) -> Tuple[List[Dict[str, Any]], List[Tuple[Optional[str], str, str]]]:
+    """naive_parse, with receiver-qualified calls tagged _EDGE_ATTR_CALLS."""
+    try:
+        with warnings.catch_warnings():
+            # Third-party code is full of invalid escapes and the like
+            warnings.simplefilter("ignore", SyntaxWarning)
+            tree = ast.parse(file_content)
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        # Also covers machine-generated files nested too deeply to parse
+        return _line_parse(file_content)
+
     symbols: List[Dict[str, Any]] = []
-    edges: List[Tuple[str, str, str]] = []
-    current_func: Optional[str] = None
-    func_lines: List[str] = []
-    
-    for line in file_content.splitlines():
-        line_strip = line.strip()
-        
-        # Detect inheritance: class Foo(Bar):
-        if line_strip.startswith("class "):
-            # finalize function if open
-            if current_func and func_lines:
-                complexity = _estimate_complexity(func_lines)
-                symbols.append({
-                    "name": current_func,
-                    "kind": "function",
-                    "complexity": complexity,
-                })
-                current_func = None
-                func_lines = []
-            
-            parts = line_strip.split("class ")[1]
-            if "(" in parts:
-                name = parts.split("(")[0]
-                bases_str = parts.split("(")[1].split(")")[0]
-                bases = [b.strip() for b in bases_str.split(",") if b.strip()]
-                symbols.append({"name": name, "kind": "class"})
-                # Add inheritance edges
-                for base in bases:
-                    if base and base != "object":
-                        edges.append((name, base, "inherits"))
-            else:
-                name = parts.split(":")[0]
-                symbols.append({"name": name, "kind": "class"})
-        
-        elif line_strip.startswith("def "):
-            # finalize previous function
-            if current_func and func_lines:
-                complexity = _estimate_complexity(func_lines)
-                symbols.append({
-                    "name": current_func,
-                    "kind": "function",
-                    "complexity": complexity,
-                })
-            current_func = line_strip.split("def ")[1].split("(")[0]
-            func_lines = []
-            # Handle single-line body: "def foo(): pass"
-            if "):" in line_strip:
-                rest = line_strip.split("):", 1)[-1].strip()
-                if rest:
-                    func_lines.append(rest)
-        
-        # Detect imports
-        elif line_strip.startswith("import ") or line_strip.startswith("from "):
-            # Simple heuristic: capture imported module names and import edges.
-            # Edges use the full dotted module path so dependency discovery can
-            # resolve internal modules (e.g. "flask.app" or ".utils").
-            if line_strip.startswith("import "):
-                mod_name = line_strip.split("import ")[1].split()[0]
-                root = mod_name.split(".")[0]
-                symbols.append({"name": root, "kind": "module"})
-                edges.append((None, mod_name, "imports"))
-            elif line_strip.startswith("from "):
-                mod_name = line_strip.split("from ")[1].split(" import")[0].strip()
-                root = mod_name.split(".")[0]
+    edges: List[Tuple[Optional[str], str, str]] = []
+
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            # Complexity and calls come from one walk over the function's own
+            # body; nested functions and classes are counted for themselves
+            complexity = 1
+            for sub in _walk_own_scope(node):
+                if isinstance(sub, _BRANCH_NODES):
+                    complexity += 1
+                elif isinstance(sub, ast.Call):
+                    callee = _callee_name(sub.func)
+                    if callee:
+                        etype = _EDGE_ATTR_CALLS if _is_attr_call(sub.func) else EDGE_CALLS
+                        edges.append((node.name, callee, etype))
+            symbols.append({
+                "name": node.name,
+                "kind": "function",
+                "complexity": complexity,
+            })
+
+        elif isinstance(node, ast.ClassDef):
+            symbols.append({"name": node.name, "kind": "class"})
+            for base in node.bases:
+                base_name = _dotted_name(base)
+                if base_name and base_name != "object":
+                    edges.append((node.name, base_name, EDGE_INHERITS))
+
+        # Edges use the full dotted module path so dependency discovery can
+        # resolve internal modules (e.g. "flask.app" or ".utils").
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                symbols.append({"name": alias.name.split(".")[0], "kind": "module"})
+                edges.append((None, alias.name, EDGE_IMPORTS))
+
+        elif isinstance(node, ast.ImportFrom):
+            mod_name = "." * node.level + (node.module or "")
+            root = (node.module or "").split(".")[0]
+            if root:
                 symbols.append({"name": root, "kind": "module"})
-                edges.append((None, mod_name, "imports"))
-        else:
-            if current_func:
-                func_lines.append(line_strip)
-    
-    # finalize tail function
-    if current_func and func_lines:
-        complexity = _estimate_complexity(func_lines)
+            edges.append((None, mod_name, EDGE_IMPORTS))
+
+    return symbols, edges
+
+
+def _walk_own_scope(func: ast.AST) -> Iterable[ast.AST]:
+    """Like ast.walk over a function, minus the insides of nested
+    functions, classes and lambdas."""
+    todo = deque(ast.iter_child_nodes(func))
+    while todo:
+        node = todo.popleft()
+        yield node
+        if not isinstance(node, _SCOPE_NODES):
+            todo.extend(ast.iter_child_nodes(node))
+
+
+def _dotted_name(node: ast.AST) -> Optional[str]:
+    """Turn a Name/Attribute chain into "pkg.mod.Name"; None for anything else."""
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        prefix = _dotted_name(node.value)
+        return f"{prefix}.{node.attr}" if prefix else None
+    return None
+
+
+def _callee_name(func: ast.AST) -> Optional[str]:
+    """Name of the function being called: foo() -> foo, obj.method() -> method."""
+    if isinstance(func, ast.Name):
+        return func.id
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    return None
+
+
+def _is_attr_call(func: ast.AST) -> bool:
+    """True for obj.method() where obj isn't self or cls."""
+    if not isinstance(func, ast.Attribute):
+        return False
+    receiver = func.value
+    return not (isinstance(receiver, ast.Name) and receiver.id in ("self", "cls"))
+
+
+def _line_parse(file_content: str) -> Tuple[List[Dict[str, Any]], List[Tuple[Optional[str], str, str]]]:
+    """Simple symbol finder: one regex scan for class/def/import lines.
+
+    Only used for files that don't parse as valid Python.
+
+    Returns:
+        symbols: list of symbol dicts
+        edges: list of (source, target, edge_type) tuples
+    """
+    symbols: List[Dict[str, Any]] = []
+    edges: List[Tuple[Optional[str], str, str]] = []
+    # (name, offset where its body starts) of the function being scanned;
+    # a function's body runs until the next class/def line.
+    open_func: Optional[Tuple[str, int]] = None
+
+    def close_func(end: int) -> None:
+        name, body_start = open_func  # type: ignore[misc]
         symbols.append({
-            "name": current_func,
+            "name": name,
             "kind": "function",
-            "complexity": complexity,
+            "complexity": _estimate_complexity(file_content[body_start:end]),
         })
-    
+
+    for m in _SYMBOL_RE.finditer(file_content):
+        cls_name, func_name = m.group("cls"), m.group("func")
+        if (cls_name or func_name) and open_func:
+            close_func(m.start())
+            open_func = None
+
+        if cls_name:
+            symbols.append({"name": cls_name, "kind": "class"})
+            for base in (m.group("bases") or "").split(","):
+                base = base.strip()
+                # Skip object and keyword arguments like metaclass=...
+                if base and base != "object" and "=" not in base:
+                    edges.append((cls_name, base, EDGE_INHERITS))
+        elif func_name:
+            open_func = (func_name, m.end())
+        else:
+            # Edges use the full dotted module path so dependency discovery
+            # can resolve internal modules (e.g. "flask.app" or ".utils").
+            mod_name = m.group("imp") or m.group("frm")
+            root = mod_name.split(".")[0]
+            if root:
+                symbols.append({"name": root, "kind": "module"})
+            edges.append((None, mod_name, EDGE_IMPORTS))
+
+    # finalize tail function
+    if open_func:
+        close_func(len(file_content))
+
     return symbols, edges
 
 
-def _estimate_complexity(lines: List[str]) -> int:
+def _estimate_complexity(body: str) -> int:
     """Rough complexity estimate based on branching keywords (if/for/and/or...)."""
-    score = 1
-    for line in lines:
-        if any(
-            k in line
-            for k in [
-                "if ",
-                "elif ",
-                "for ",
-                "while ",
-                " and ",
-                " or ",
-                " except ",
-            ]
-        ):
-            score += 1
-    return score
-
-
-def _add_file_to_ccg(ccg: CodeContextGraph, fpath: str, content: str) -> None:
-    """Parse a single Python source file and add symbols/edges to the graph."""
-    ext = Path(fpath).suffix
-    symbols: List[Dict[str, Any]] = []
-    call_edges: List[Tuple[str, str]] = []  # (caller, callee)
-    inherit_edges: List[Tuple[str, str]] = []  # (child, parent)
-    import_edges: List[str] = []  # imported module targets
+    return 1 + len(_COMPLEXITY_RE.findall(body))
+
+
+ParseResult = Tuple[
+    List[Dict[str, Any]],  # symbols
+    List[Tuple[str, str, bool]],  # calls: (caller, callee, resolve across files)
+    List[Tuple[str, str]],  # inherits: (child, parent)
+    List[str],  # imported module targets
+]
+
 
-    if ext == ".py" and HAS_TREESITTER:
+def _parser_tag(ext: str) -> str:
+    """Which parser _parse_source will try for a file type: "treesitter"
+    only if the grammar actually loads, else "ast"."""
+    if ext == ".py" and HAS_TREESITTER and _python_parser() is not None:
+        return "treesitter"
+    return "ast"
+
+
+def _parse_source(ext: str, content: str) -> Tuple[str, ParseResult]:
+    """Parse one file's source into symbols, calls, inheritance, and imports.
+
+    Returns the tag of the parser that produced the result with it.
+    """
+    if _parser_tag(ext) == "treesitter":
         try:
             ts_symbols, ts_calls, ts_imports, ts_inherits = (
                 _py_symbols_and_calls_treesitter(content)
             )
-            symbols = ts_symbols
-            call_edges = ts_calls
-            import_edges = ts_imports
-            inherit_edges = ts_inherits
+            return "treesitter", (ts_symbols, ts_calls, ts_inherits, ts_imports)
         except Exception:
-            symbols, edges = naive_parse(content)
-            inherit_edges = [
-                (src, tgt) for src, tgt, etype in edges if etype == "inherits"
-            ]
-            import_edges = [tgt for src, tgt, etype in edges if etype == "imports"]
+            pass
+    symbols, edges = _naive_parse(content)
+    call_edges = [
+        (src, tgt, etype == EDGE_CALLS)
+        for src, tgt, etype in edges
+        if etype == EDGE_CALLS or etype == _EDGE_ATTR_CALLS
+    ]
+    inherit_edges = [(src, tgt) for src, tgt, etype in edges if etype == EDGE_INHERITS]
+    import_edges = [tgt for src, tgt, etype in edges if etype == EDGE_IMPORTS]
+    return "ast", (symbols, call_edges, inherit_edges, import_edges)
+
+
+def _parse_source_cached(ext: str, content: str) -> ParseResult:
+    """Same as _parse_source, but remembers results on disk by content hash.
+
+    Unchanged files (across discovery passes, repeat runs, or re-generated
+    docs) are loaded from AST_CACHE_DIR instead of being parsed again.
+    """
+    parser_tag = _parser_tag(ext)
+    hasher = hashlib.sha1(f"{_AST_CACHE_VERSION}:{parser_tag}:{ext}:".encode())
+    hasher.update(content.encode("utf-8", errors="ignore"))
+    cache_path = os.path.join(AST_CACHE_DIR, f"{hasher.hexdigest()}.pickle")
+
+    try:
+        with open(cache_path, "rb") as f:
+            return pickle.load(f)
+    except Exception:
+        pass
+
+    used_tag, parsed = _parse_source(ext, content)
+    if used_tag != parser_tag:
+        # Tree-sitter gave up on this file and ast stood in; don't file
+        # that result under the Tree-sitter key
+        return parsed
+    try:
+        os.makedirs(AST_CACHE_DIR, exist_ok=True)
+        # Write to a temp file first so concurrent runs never see half an entry
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(parsed, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass  # A read-only disk just means no caching
+    return parsed
+
+
+def _prune_ast_cache() -> None:
+    """Keep AST_CACHE_DIR under AST_CACHE_MAX_BYTES by deleting the oldest
+    entries (by modification time) once it grows past the limit.
+
+    Skipped if another check ran within the last AST_CACHE_PRUNE_INTERVAL.
+    """
+    marker = os.path.join(AST_CACHE_DIR, _AST_PRUNE_MARKER)
+    try:
+        if time.time() - os.stat(marker).st_mtime < AST_CACHE_PRUNE_INTERVAL:
+            return
+    except OSError:
+        pass  # Never checked yet
+    try:
+        with open(marker, "a"):
+            pass
+        os.utime(marker)
+    except OSError:
+        return  # No cache directory (or not writable): nothing to prune
+
+    entries: List[Tuple[float, int, str]] = []
+    try:
+        with os.scandir(AST_CACHE_DIR) as it:
+            for e in it:
+                if e.is_file(follow_symlinks=False) and e.name != _AST_PRUNE_MARKER:
+                    st = e.stat(follow_symlinks=False)
+                    entries.append((st.st_mtime, st.st_size, e.path))
+    except OSError:
+        return
+    total = sum(size for _, size, _ in entries)
+    if total <= AST_CACHE_MAX_BYTES:
+        return
+    entries.sort()
+    for _, size, path in entries:
+        if total <= AST_CACHE_PRUNE_TO:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+
+
+def _parse_one_file(fpath: str) -> Optional[ParseResult]:
+    """Read and parse a single source file; None if it can't be read.
+
+    Module-level (and returning plain tuples) so worker processes can run it.
+    Files over MAX_SOURCE_BYTES (generated or vendored code) are skipped.
+    """
+    try:
+        with open(fpath, "rb", buffering=_READ_BUFFER_BYTES) as f:
+            # fstat on the open file rather than a separate path lookup
+            if os.fstat(f.fileno()).st_size > MAX_SOURCE_BYTES:
+                return None
+            content = f.read().decode("utf-8", errors="ignore")
+    except Exception:
+        return None
+    try:
+        return _parse_source_cached(os.path.splitext(fpath)[1], content)
+    except Exception:
+        # One pathological file must never take the whole analysis down
+        return None
+
+
+def _parse_files(
+    file_paths: List[str], max_workers: Optional[int] = None
+) -> List[Tuple[str, ParseResult]]:
+    """Parse files across worker processes, returning (path, result) pairs.
+
+    max_workers defaults to CODEBASE_GENIUS_PARSE_WORKERS, else the CPU
+    count. Small batches are parsed in-process, where starting workers would
+    cost more than it saves, and so is everything when we're already running
+    in a worker process (e.g. the API server's pool), so pools never nest.
+    """
+    if max_workers is None:
+        max_workers = int(os.getenv("CODEBASE_GENIUS_PARSE_WORKERS") or os.cpu_count() or 1)
+    results: Iterable[Optional[ParseResult]]
+    if (
+        len(file_paths) < _PARALLEL_MIN_FILES
+        or max_workers <= 1
+        or multiprocessing.parent_process() is not None
+    ):
+        results = map(_parse_one_file, file_paths)
     else:
-        symbols, edges = naive_parse(content)
-        inherit_edges = [
-            (src, tgt) for src, tgt, etype in edges if etype == "inherits"
-        ]
-        import_edges = [tgt for src, tgt, etype in edges if etype == "imports"]
+        pool = None
+        try:
+            pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context(_MP_START_METHOD),
+            )
+            # Submits everything up front, which is when the workers start
+            pending = pool.map(_parse_one_file, file_paths, chunksize=16)
+        except (OSError, NotImplementedError):
+            # Some sandboxed hosts can't start worker processes
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+            results = map(_parse_one_file, file_paths)
+        else:
+            # A worker dying mid-run (BrokenProcessPool) is not retried
+            # in-process: the file that killed it would just do it again
+            with pool:
+                results = list(pending)
+    parsed_files = [
+        (fpath, parsed)
+        for fpath, parsed in zip(file_paths, results)
+        if parsed is not None
+    ]
+    _prune_ast_cache()
+    return parsed_files
+
+
+def _add_file_symbols(
+    ccg: CodeContextGraph,
+    fpath: str,
+    symbols: List[Dict[str, Any]],
+    symbol_table: Dict[str, Optional[str]],
+) -> None:
+    """Add one file's definitions to the graph and the global symbol table."""
+    # Insert straight into the node dict: each key is formatted once, and an
+    # existing node only gets its complexity refreshed (as add_symbol does).
+    nodes = ccg.nodes
 
     for s in symbols:
-        ccg.add_symbol(
-            fpath,
-            s["name"],
-            s["kind"],
-            complexity=s.get("complexity", 1),
-        )
+        name = s["name"]
+        key = f"{fpath}:{name}"
+        complexity = s.get("complexity", 1)
+        node = nodes.get(key)
+        if node is None:
+            nodes[key] = {
+                "file": fpath,
+                "name": name,
+                "kind": s["kind"],
+                "complexity": complexity,
+            }
+        else:
+            node["complexity"] = complexity
+        if s["kind"] == "module":
+            continue
+        # Names defined in more than one file are ambiguous: map them to None
+        seen = symbol_table.get(name, key)
+        symbol_table[name] = key if seen == key else None
+
+
+def _resolve_target(
+    nodes: Dict[str, Dict[str, Any]],
+    symbol_table: Dict[str, Optional[str]],
+    fpath: str,
+    name: str,
+    cross_file: bool = True,
+) -> str:
+    """Key for a referenced name: same-file definition first, then (when
+    cross_file) a unique definition elsewhere, else a placeholder key in
+    the referencing file."""
+    key = f"{fpath}:{name}"
+    if key in nodes or not cross_file:
+        return key
+    return symbol_table.get(name) or key
+
+
+def _add_file_edges(
+    ccg: CodeContextGraph,
+    fpath: str,
+    parsed: ParseResult,
+    placeholders: Set[str],
+) -> None:
+    """Add one file's call/inherit/import edges, resolved against every
+    definition collected in the first pass.
+
+    Keys of the placeholder nodes minted for unresolved targets are added
+    to `placeholders`.
+    """
+    _, call_edges, inherit_edges, import_edges = parsed
+    nodes = ccg.nodes
+    symbol_table = ccg.symbol_table
 
     # Add call edges
-    for caller, callee in call_edges:
+    for caller, callee, cross_file in call_edges:
         src = f"{fpath}:{caller}"
-        tgt = f"{fpath}:{callee}"
-        # Ensure target exists (best-effort)
-        if tgt not in ccg.nodes:
-            ccg.add_symbol(fpath, callee, "function")
-        if src not in ccg.nodes:
-            ccg.add_symbol(fpath, caller, "function")
-        ccg.add_edge(src, tgt, "calls")
+        # obj.method() calls stay in their own file: a bare method name
+        # says nothing about which class (or library) it belongs to
+        tgt = _resolve_target(nodes, symbol_table, fpath, callee, cross_file)
+        # Unresolved (builtins, third-party): keep a best-effort placeholder
+        if tgt not in nodes:
+            nodes[tgt] = {"file": fpath, "name": callee, "kind": "function", "complexity": 1}
+            placeholders.add(tgt)
+        if src not in nodes:
+            nodes[src] = {"file": fpath, "name": caller, "kind": "function", "complexity": 1}
+        if cross_file and tgt in placeholders:
+            ccg.unresolved[callee].append(len(ccg.edges))
+        ccg.add_edge(src, tgt, EDGE_CALLS)
 
     # Add inheritance edges
     for child, parent in inherit_edges:
         src = f"{fpath}:{child}"
-        tgt = f"{fpath}:{parent}"
-        # Ensure both exist
-        if src not in ccg.nodes:
-            ccg.add_symbol(fpath, child, "class")
-        if tgt not in ccg.nodes:
-            ccg.add_symbol(fpath, parent, "class")
-        ccg.add_edge(src, tgt, "inherits")
+        tgt = _resolve_target(nodes, symbol_table, fpath, parent)
+        if src not in nodes:
+            nodes[src] = {"file": fpath, "name": child, "kind": "class", "complexity": 1}
+        if tgt not in nodes:
+            nodes[tgt] = {"file": fpath, "name": parent, "kind": "class", "complexity": 1}
+            placeholders.add(tgt)
+        if tgt in placeholders:
+            ccg.unresolved[parent].append(len(ccg.edges))
+        ccg.add_edge(src, tgt, EDGE_INHERITS)
 
     # Add import edges (file-level: source is the importing file path)
     for module in import_edges:
-        ccg.add_edge(fpath, module, "imports")
+        ccg.add_edge(fpath, module, EDGE_IMPORTS)
+
+
+def _merge_parsed(
+    ccg: CodeContextGraph, parsed_files: List[Tuple[str, ParseResult]]
+) -> None:
+    """Merge parsed files into the graph in two passes.
+
+    Pass one records every definition, so pass two can point call and
+    inherit edges at the real node even when it lives in another file,
+    instead of minting a placeholder in the caller's file. Definitions
+    already in the graph (seeded from an earlier merge) count too, and
+    earlier edges that found no definition get another chance at one.
+    """
+    for fpath, parsed in parsed_files:
+        _add_file_symbols(ccg, fpath, parsed[0], ccg.symbol_table)
+    if ccg.unresolved:
+        _resolve_seeded_edges(ccg)
+    placeholders: Set[str] = set()
+    for fpath, parsed in parsed_files:
+        _add_file_edges(ccg, fpath, parsed, placeholders)
+
+
+def _resolve_seeded_edges(ccg: CodeContextGraph) -> None:
+    """Point edges that earlier merges left on placeholders at definitions
+    that have since been added, dropping placeholders nothing uses now."""
+    edges = ccg.edges
+    stale: Set[str] = set()
+    for name in list(ccg.unresolved):
+        key = ccg.symbol_table.get(name)
+        if key is None:
+            continue
+        for i in ccg.unresolved.pop(name):
+            edge = edges[i]
+            stale.add(edge["target"])
+            # A new dict: the seeded ones may still belong to the caller's CCG
+            edges[i] = {**edge, "target": key}
+    if not stale:
+        return
+    for e in edges:
+        stale.discard(e["source"])
+        stale.discard(e["target"])
+    for key in stale:
+        ccg.nodes.pop(key, None)
+    ccg.set_edges(edges)
 
 
 def _seed_ccg_from_dict(ccg: CodeContextGraph, ccg_dict: Dict[str, Any]) -> None:
@@ -278,20 +742,49 @@ def _seed_ccg_from_dict(ccg: CodeContextGraph, ccg_dict: Dict[str, Any]) -> None
                 "kind": n.get("kind", ""),
                 "complexity": n.get("complexity", 1),
             }
-    ccg.edges = list(ccg_dict.get("edges", []))
+    ccg.set_edges(ccg_dict.get("edges", []))
+
+    symbols = ccg_dict.get("_symbols")
+    if symbols is not None:
+        ccg.symbol_table.update(symbols)
+        for name, indexes in ccg_dict.get("_unresolved", {}).items():
+            ccg.unresolved[name].extend(indexes)
+        return
+    # Hand-built or loaded from JSON: every non-module node counts as a
+    # definition, under the same ambiguity rule as _add_file_symbols
+    symbol_table = ccg.symbol_table
+    for key, n in ccg.nodes.items():
+        if n["kind"] == "module":
+            continue
+        seen = symbol_table.get(n["name"], key)
+        symbol_table[n["name"]] = key if seen == key else None
+
+
+def _iter_sources(root_path: str, top_level: bool = True) -> Iterable[str]:
+    """Yield supported source files under root_path, skipping IGNORE_DIRS
+    (and TOP_LEVEL_IGNORE_DIRS directly under the root).
+
+    Uses os.scandir directly: DirEntry answers is_dir() from the directory
+    listing itself, so there's no extra stat per entry.
+    """
+    try:
+        with os.scandir(root_path) as it:
+            entries = list(it)
+    except OSError:
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            name = entry.name
+            if name in IGNORE_DIRS or (top_level and name in TOP_LEVEL_IGNORE_DIRS):
+                continue
+            yield from _iter_sources(entry.path, top_level=False)
+        elif os.path.splitext(entry.name)[1] in SUPPORTED_EXT:
+            yield entry.path
 
 
 def list_python_files(root_path: str) -> List[str]:
     """Return all supported source file paths under root_path."""
-    files: List[str] = []
-    for dirpath, dirnames, filenames in os.walk(root_path):
-        dirnames[:] = [
-            d for d in dirnames if d not in IGNORE_DIRS
-        ]
-        for fname in filenames:
-            if Path(fname).suffix in SUPPORTED_EXT:
-                files.append(os.path.join(dirpath, fname))
-    return files
+    return list(_iter_sources(root_path))
 
 
 def analyze_files(
@@ -311,167 +804,366 @@ def analyze_files(
     if base_ccg:
         _seed_ccg_from_dict(ccg, base_ccg)
 
-    for fpath in file_paths:
-        if Path(fpath).suffix not in SUPPORTED_EXT:
-            continue
-        try:
-            content = Path(fpath).read_text(encoding="utf-8", errors="ignore")
-        except Exception:
-            continue
-        _add_file_to_ccg(ccg, fpath, content)
+    sources = [f for f in file_paths if os.path.splitext(f)[1] in SUPPORTED_EXT]
+    _merge_parsed(ccg, _parse_files(sources))
 
     return ccg.to_dict()
 
 
 def build_ccg(root_path: str) -> Dict[str, Any]:
+    # Same pruned walk as list_python_files, so .git, virtualenvs and
+    # build output never get traversed
+    sources = list_python_files(root_path)
+
     ccg = CodeContextGraph()
-    for dirpath, _, filenames in os.walk(root_path):
-        for fname in filenames:
-            ext = Path(fname).suffix
-            if ext not in SUPPORTED_EXT:
-                continue
-            fpath = os.path.join(dirpath, fname)
-            try:
-                content = Path(fpath).read_text(
-                    encoding="utf-8",
-                    errors="ignore",
-                )
-            except Exception:
-                continue
-            _add_file_to_ccg(ccg, fpath, content)
+    _merge_parsed(ccg, _parse_files(sources))
     return ccg.to_dict()
 
 
 def analyze_repo(repo_path: str) -> Dict[str, Any]:
-    return build_ccg(repo_path)
+    """build_ccg for a whole repository, cached per commit.
 
-
-if __name__ == "__main__":
-    import argparse
-    ap = argparse.ArgumentParser()
-    ap.add_argument("repo_path")
-    args = ap.parse_args()
-    result = analyze_repo(args.repo_path)
-    print(json.dumps(result, indent=2))
+    For a git checkout with no local changes, the CCG is saved under
+    CCG_CACHE_DIR and handed back as-is while HEAD stays the same, skipping
+    the parse and the merge entirely.
+    """
+    head = _clean_head(repo_path)
+    if head is None:
+        return build_ccg(repo_path)
+
+    # The CCG holds absolute file paths, so the entry belongs to this exact
+    # checkout location
+    real_path = os.path.realpath(repo_path)
+    key = f"{_CCG_CACHE_VERSION}:{_AST_CACHE_VERSION}:{_parser_tag('.py')}:{real_path}:{head}"
+    path_hash = hashlib.sha1(real_path.encode("utf-8", errors="ignore")).hexdigest()
+    cache_path = os.path.join(CCG_CACHE_DIR, f"{path_hash}.json")
+    cached = _load_cached_ccg(cache_path, key)
+    if cached is not None:
+        return cached
+
+    ccg = build_ccg(repo_path)
+    entry = {
+        "key": key,
+        "nodes": ccg["nodes"],
+        "edges": ccg["edges"],
+        "symbols": ccg["_symbols"],
+        "unresolved": ccg["_unresolved"],
+    }
+    try:
+        os.makedirs(CCG_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        data = orjson.dumps(entry) if orjson is not None else json.dumps(entry).encode("utf-8")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass  # A read-only disk just means no caching
+    return ccg
+
+
+def _load_cached_ccg(cache_path: str, key: str) -> Optional[Dict[str, Any]]:
+    """The CCG stored at cache_path if it was saved under `key`, else None."""
+    try:
+        with open(cache_path, "rb") as f:
+            entry = json.loads(f.read())
+        if entry.get("key") != key:
+            return None
+        ccg = CodeContextGraph()
+        for n in entry["nodes"]:
+            ccg.nodes[f"{n['file']}:{n['name']}"] = n
+        edges = entry["edges"]
+        for e in edges:
+            e["type"] = sys.intern(e["type"])
+        ccg.set_edges(edges)
+        ccg.symbol_table = entry["symbols"]
+        ccg.unresolved.update(entry["unresolved"])
+        return ccg.to_dict()
+    except Exception:
+        return None
+
+
+def _clean_head(repo_path: str) -> Optional[str]:
+    """The commit checked out at repo_path, or None when it doesn't fully
+    describe the files build_ccg would read (not a repo root, no git, local
+    changes, or gitignored source files outside the skipped directories)."""
+    # A directory in a plain checkout, a file in a worktree
+    if not os.path.exists(os.path.join(repo_path, ".git")):
+        return None
+    try:
+        head = subprocess.run(
+            ["git", "-C", repo_path, "rev-parse", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        changes = subprocess.run(
+            ["git", "-C", repo_path, "status", "--porcelain"],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        # status doesn't report ignored files, but build_ccg parses them
+        ignored = subprocess.run(
+            ["git", "-C", repo_path, "ls-files", "-z", "--others", "--ignored",
+             "--exclude-standard", "--", *(f"*{ext}" for ext in SUPPORTED_EXT)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    if not head or changes.strip():
+        return None
+    for rel_path in ignored.split("\0"):
+        parts = rel_path.split("/")
+        if not rel_path or parts[0] in TOP_LEVEL_IGNORE_DIRS:
+            continue
+        if not any(part in IGNORE_DIRS for part in parts[:-1]):
+            return None
+    return head
 
 
 # ---- Internal helpers (Tree-sitter best-effort) ----
-def _py_symbols_and_calls_treesitter(
-    content: str,
-) -> Tuple[List[Dict[str, str]], List[Tuple[str, str]], List[str], List[Tuple[str, str]]]:
+TreeSitterResult = Tuple[
+    List[Dict[str, str]], List[Tuple[str, str, bool]], List[str], List[Tuple[str, str]]
+]
+
+
+def _py_symbols_and_calls_treesitter(content: str) -> TreeSitterResult:
     """Extract Python symbols, intra-function calls, imports, and inheritance.
     Requires a tree-sitter python grammar; caller wraps in try/except.
 
     Returns:
         symbols: list of symbol dicts
-        calls: list of (caller, callee) tuples
+        calls: list of (caller, callee, resolve across files) tuples
         imports: list of imported module targets (dotted paths, may start with '.')
         inherits: list of (child_class, base_class) tuples
     """
-    parser = get_parser("python")  # type: ignore[name-defined]
-    tree = parser.parse(bytes(content, "utf-8"))
+    parser = _python_parser()
+    if parser is None:
+        raise RuntimeError("Tree-sitter python grammar unavailable")
+    source = bytes(content, "utf-8")
+    tree = parser.parse(source)
+
+    # Node offsets are byte offsets, so slice the encoded source (slicing the
+    # str goes wrong as soon as a file contains non-ASCII text)
+    def node_text(node) -> str:
+        return source[node.start_byte:node.end_byte].decode("utf-8", errors="ignore")
 
+    query = _python_query()
+    if query is not None:
+        return _ts_query_extract(tree.root_node, node_text, query)
+    return _ts_walk_extract(tree.root_node, node_text)
+
+
+def _ts_query_extract(root, node_text, query) -> TreeSitterResult:
+    """Collect everything through the compiled query.
+
+    Tree-sitter does the traversal and pattern matching in C and hands back
+    only the captured nodes, so Python never touches the rest of the tree.
+    """
+    captures = _ts_captures(query, root)
     symbols: List[Dict[str, str]] = []
-    calls: List[Tuple[str, str]] = []
+    calls: List[Tuple[str, str, bool]] = []
     imports: List[str] = []
     inherits: List[Tuple[str, str]] = []
 
-    # Minimal recursive walk to capture definitions, calls, and imports
-    def node_text(node) -> str:
-        return content[node.start_byte:node.end_byte]
+    for name_node in captures.get("function", []):
+        symbols.append({"name": node_text(name_node), "kind": "function"})
+
+    for name_node in captures.get("class", []):
+        name = node_text(name_node)
+        symbols.append({"name": name, "kind": "class"})
+        inherits.extend(_ts_class_bases(name_node.parent, name, node_text))
+
+    for callee in captures.get("call", []):
+        caller = _ts_enclosing_function(callee, node_text)
+        if caller:
+            calls.append((caller, node_text(callee), not _ts_is_attr_call(callee, node_text)))
 
-    current_func: Optional[str] = None
+    for node in captures.get("import", []):
+        imports.extend(_ts_import_targets(node, node_text))
+
+    return symbols, calls, imports, inherits
+
+
+def _ts_walk_extract(root, node_text) -> TreeSitterResult:
+    """Collect everything by walking the tree; used when the query can't be
+    compiled for the installed grammar."""
+    symbols: List[Dict[str, str]] = []
+    calls: List[Tuple[str, str, bool]] = []
+    imports: List[str] = []
+    inherits: List[Tuple[str, str]] = []
 
-    def walk(node):
-        nonlocal current_func
+    # Iterative walk over named nodes only (punctuation and keywords can't
+    # hold definitions or calls). Each stack entry carries the function it
+    # sits in, so calls are attributed without a separate scope stack.
+    stack: List[Tuple[Any, Optional[str]]] = [(root, None)]
+    while stack:
+        node, current_func = stack.pop()
         t = node.type
 
-        # function_definition: first child with type 'identifier' is the name
         if t == "function_definition":
-            # Children: 'def', name(identifier), parameters, ':' , block
-            name = None
-            for ch in node.children:
-                if ch.type == "identifier":
-                    name = node_text(ch)
-                    break
-            if name:
-                symbols.append({"name": name, "kind": "function"})
-                prev = current_func
-                current_func = name
-                for ch in node.children:
-                    walk(ch)
-                current_func = prev
-                return
-
-        # class_definition: first child identifier is name
-        if t == "class_definition":
-            name = None
-            for ch in node.children:
-                if ch.type == "identifier":
-                    name = node_text(ch)
-                    break
-            if name:
+            name_node = node.child_by_field_name("name")
+            if name_node is not None:
+                current_func = node_text(name_node)
+                symbols.append({"name": current_func, "kind": "function"})
+
+        elif t == "class_definition":
+            name_node = node.child_by_field_name("name")
+            if name_node is not None:
+                name = node_text(name_node)
                 symbols.append({"name": name, "kind": "class"})
-                # Extract base classes (e.g. Foo(Base, Mixin)); grammar uses
-                # "superclass" (older grammars) or "argument_list" (newer).
-                for ch in node.children:
-                    if ch.type in ("superclass", "argument_list"):
-                        bases: List[str] = []
-                        _collect_base_names(ch, node_text, bases)
-                        for base in bases:
-                            if base != name and base != "object":
-                                inherits.append((name, base))
-
-        # import a.b.c, d  -> capture full dotted module paths
-        if t == "import_statement":
-            for ch in node.children:
-                if ch.type == "dotted_name":
-                    imports.append(node_text(ch))
-                elif ch.type == "aliased_import":
-                    for c in ch.children:
-                        if c.type == "dotted_name":
-                            imports.append(node_text(c))
-                            break
-
-        # from <module> import <names>  (module may be relative: "..utils")
-        if t == "import_from_statement":
-            module_parts: List[str] = []
-            for ch in node.children:
-                if ch.type == "import":  # only the module part precedes it
-                    break
-                if ch.type == "relative_import":
-                    module_parts.append(node_text(ch))
-                elif ch.type == "dotted_name":
-                    module_parts.append(node_text(ch))
-            if module_parts:
-                imports.append("".join(module_parts))
-
-        # call: extract simple identifier callee
-        if t == "call":
-            # Heuristic: first child may be the function name
-            if node.children:
-                fn = node.children[0]
-                # For attribute access (obj.method), child may be attribute
-                callee = None
-                if fn.type == "identifier":
-                    callee = node_text(fn)
-                elif fn.type == "attribute":
-                    # attribute -> child identifier is the attribute name
-                    for ch in fn.children:
-                        if ch.type == "property_identifier":
-                            callee = node_text(ch)
-                            break
-                        if ch.type == "identifier":  # fallback
-                            callee = node_text(ch)
-                            break
-                if callee and current_func:
-                    calls.append((current_func, callee))
+                inherits.extend(_ts_class_bases(node, name, node_text))
+
+        elif t in ("import_statement", "import_from_statement"):
+            imports.extend(_ts_import_targets(node, node_text))
+            continue  # nothing else of interest inside an import
+
+        # call: foo() -> "foo", obj.method() -> "method"
+        elif t == "call" and current_func:
+            fn = node.child_by_field_name("function")
+            callee_node = None
+            if fn is not None and fn.type == "identifier":
+                callee_node = fn
+            elif fn is not None and fn.type == "attribute":
+                callee_node = fn.child_by_field_name("attribute")
+            if callee_node is not None:
+                calls.append((
+                    current_func,
+                    node_text(callee_node),
+                    not _ts_is_attr_call(callee_node, node_text),
+                ))
+
+        # Push in reverse so children come off the stack in source order;
+        # leaves (identifiers, literals) have nothing worth visiting.
+        for ch in reversed(node.named_children):
+            if ch.named_child_count:
+                stack.append((ch, current_func))
+
+    return symbols, calls, imports, inherits
+
 
+def _ts_is_attr_call(callee_node, node_text) -> bool:
+    """True when the called name is obj.<name> with obj other than self/cls."""
+    parent = callee_node.parent
+    if parent is None or parent.type != "attribute":
+        return False
+    receiver = parent.child_by_field_name("object")
+    return receiver is None or node_text(receiver) not in ("self", "cls")
+
+
+def _ts_class_bases(class_node, name: str, node_text) -> List[Tuple[str, str]]:
+    """(child, base) pairs for a class_definition node."""
+    inherits: List[Tuple[str, str]] = []
+    # Extract base classes (e.g. Foo(Base, Mixin)); grammar uses
+    # "superclass" (older grammars) or "argument_list" (newer).
+    for ch in class_node.children:
+        if ch.type in ("superclass", "argument_list"):
+            bases: List[str] = []
+            _collect_base_names(ch, node_text, bases)
+            for base in bases:
+                if base != name and base != "object":
+                    inherits.append((name, base))
+    return inherits
+
+
+def _ts_import_targets(node, node_text) -> List[str]:
+    """Module paths named by an import / from-import statement node."""
+    imports: List[str] = []
+    # import a.b.c, d  -> capture full dotted module paths
+    if node.type == "import_statement":
+        for ch in node.children:
+            if ch.type == "dotted_name":
+                imports.append(node_text(ch))
+            elif ch.type == "aliased_import":
+                for c in ch.children:
+                    if c.type == "dotted_name":
+                        imports.append(node_text(c))
+                        break
+
+    # from <module> import <names>  (module may be relative: "..utils")
+    elif node.type == "import_from_statement":
+        module_parts: List[str] = []
         for ch in node.children:
-            walk(ch)
+            if ch.type == "import":  # only the module part precedes it
+                break
+            if ch.type == "relative_import":
+                module_parts.append(node_text(ch))
+            elif ch.type == "dotted_name":
+                module_parts.append(node_text(ch))
+        if module_parts:
+            imports.append("".join(module_parts))
+    return imports
+
+
+def _ts_enclosing_function(node, node_text) -> Optional[str]:
+    """Name of the innermost function definition containing node, if any."""
+    parent = node.parent
+    while parent is not None:
+        if parent.type == "function_definition":
+            name_node = parent.child_by_field_name("name")
+            return node_text(name_node) if name_node is not None else None
+        parent = parent.parent
+    return None
+
+
+def _ts_compile_query(language, source: str):
+    """Compile a query with either the current (Query(...)) or the older
+    (language.query(...)) py-tree-sitter API."""
+    try:
+        from tree_sitter import Query  # type: ignore
 
-    walk(tree.root_node)
-    return symbols, calls, imports, inherits
+        return Query(language, source)
+    except (ImportError, TypeError):
+        return language.query(source)
+
+
+def _ts_captures(query, node) -> Dict[str, List[Any]]:
+    """Run a query and group captured nodes by capture name.
+
+    Newer bindings return that dict from QueryCursor.captures; older ones
+    return (node, name) pairs from Query.captures.
+    """
+    try:
+        from tree_sitter import QueryCursor  # type: ignore
+
+        captures = QueryCursor(query).captures(node)
+    except ImportError:
+        captures = query.captures(node)
+    if isinstance(captures, dict):
+        return captures
+    grouped: Dict[str, List[Any]] = defaultdict(list)
+    for captured, capture_name in captures:
+        grouped[capture_name].append(captured)
+    return grouped
+
+
+@functools.lru_cache(maxsize=None)
+def _python_parser():
+    """The Tree-sitter Python parser, imported and built once per process.
+    None if the grammar package can't be loaded."""
+    try:
+        module = importlib.import_module(_TS_PACKAGE)  # type: ignore[arg-type]
+        return module.get_parser("python")
+    except Exception:  # pragma: no cover - optional path
+        return None
+
+
+# Everything the Tree-sitter path needs, as one query compiled on first use
+_PY_QUERY_SOURCE = """
+(function_definition name: (identifier) @function)
+(class_definition name: (identifier) @class)
+(call function: [
+  (identifier) @call
+  (attribute attribute: (identifier) @call)
+])
+[(import_statement) (import_from_statement)] @import
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def _python_query():
+    """The compiled _PY_QUERY_SOURCE, or None to fall back to walking the tree."""
+    try:
+        module = importlib.import_module(_TS_PACKAGE)  # type: ignore[arg-type]
+        return _ts_compile_query(module.get_language("python"), _PY_QUERY_SOURCE)
+    except Exception:  # pragma: no cover - grammar/binding mismatch, walk instead
+        return None
 
 
 def _collect_base_names(
@@ -501,28 +1193,60 @@ def aggregate_ccg_statistics(ccg: Dict[str, Any]) -> Dict[str, Any]:
     nodes = ccg.get("nodes", [])
     edges = ccg.get("edges", [])
     
-    # Count node types
-    classes = sum(1 for n in nodes if n.get("kind") == "class")
-    functions = sum(1 for n in nodes if n.get("kind") == "function")
-    modules = sum(1 for n in nodes if n.get("kind") == "module")
-    
-    # Count edge types (lowercase, matching what build_ccg produces)
-    inheritance_edges = sum(1 for e in edges if e.get("type") == "inherits")
-    call_edges = sum(1 for e in edges if e.get("type") == "calls")
-    import_edges = sum(1 for e in edges if e.get("type") == "imports")
+    # Count node and edge types (edge types are lowercase, matching what
+    # build_ccg produces). CCGs from CodeContextGraph.to_dict carry the
+    # counts already; anything else gets one pass over each list.
+    node_counts = ccg.get("node_counts")
+    if node_counts is None:
+        node_counts = Counter(n.get("kind") for n in nodes)
+    edge_counts = ccg.get("edge_counts")
+    if edge_counts is None:
+        edge_counts = Counter(e.get("type") for e in edges)
     
     return {
         "total_symbols": len(nodes),
-        "classes": classes,
-        "functions": functions,
-        "modules": modules,
+        "classes": node_counts.get("class", 0),
+        "functions": node_counts.get("function", 0),
+        "modules": node_counts.get("module", 0),
         "total_edges": len(edges),
-        "inheritance_edges": inheritance_edges,
-        "call_edges": call_edges,
-        "import_edges": import_edges,
+        "inheritance_edges": edge_counts.get(EDGE_INHERITS, 0),
+        "call_edges": edge_counts.get(EDGE_CALLS, 0),
+        "import_edges": edge_counts.get(EDGE_IMPORTS, 0),
     }
 
 
+def _find_module_file(repo_path: str, module_path: str) -> Optional[str]:
+    """Find the file for a module path ("myapp/utils") under repo_path."""
+    potential_py = os.path.join(repo_path, f"{module_path}.py")
+    if os.path.exists(potential_py):
+        return potential_py
+    potential_init = os.path.join(repo_path, module_path, "__init__.py")
+    if os.path.exists(potential_init):
+        return potential_init
+    return None
+
+
+def _analyzed_modules(nodes: List[Dict[str, Any]], repo_path: str) -> frozenset:
+    """Dotted names of the modules parsed into the CCG, derived from the
+    files its nodes came from (".../flask/flask/app.py" -> "flask.app").
+
+    Using file paths instead of module-kind node names prevents imported
+    modules from being misclassified as "already analyzed". Each file is
+    converted once, however many symbols it holds.
+    """
+    analyzed: Set[str] = set()
+    for fpath in {n.get("file") for n in nodes}:
+        if not fpath:
+            continue
+        rel = os.path.relpath(fpath, repo_path)
+        if rel.startswith(os.pardir):
+            rel = os.path.basename(fpath)
+        if rel.endswith(".py"):
+            rel = rel[:-3]
+        analyzed.add(rel.replace(os.sep, "."))
+    return frozenset(analyzed)
+
+
 def discover_dependencies(ccg: Dict[str, Any], repo_path: str) -> Dict[str, Any]:
     """Discover unanalyzed dependencies from CCG imports.
     
@@ -540,32 +1264,45 @@ def discover_dependencies(ccg: Dict[str, Any], repo_path: str) -> Dict[str, Any]
     """
     edges = ccg.get("edges", [])
     nodes = ccg.get("nodes", [])
-    
-    # Get all analyzed modules, derived from the files that were actually
-    # parsed into the CCG (e.g. ".../flask/flask/app.py" -> "flask.app").
-    # Using file paths instead of module-kind node names prevents imported
-    # modules from being misclassified as "already analyzed".
-    analyzed_modules: Set[str] = set()
-    for n in nodes:
-        fpath = n.get("file")
-        if not fpath:
-            continue
-        rel = os.path.relpath(fpath, repo_path)
-        if rel.startswith(os.pardir):
-            rel = os.path.basename(fpath)
-        if rel.endswith(".py"):
-            rel = rel[:-3]
-        analyzed_modules.add(rel.replace(os.sep, "."))
+
+    # CCGs from CodeContextGraph.to_dict carry their edges grouped by type
+    edges_by_type = ccg.get("_edges_by_type")
+    if edges_by_type is not None:
+        import_edges = edges_by_type.get(EDGE_IMPORTS, [])
+    else:
+        import_edges = [e for e in edges if e.get("type") == EDGE_IMPORTS]
+
+    analyzed_modules = _analyzed_modules(nodes, repo_path)
+
+    # Nothing imported (empty CCG, or analysis skipped): nothing to resolve,
+    # so skip the suffix index and filesystem probes entirely
+    if not import_edges:
+        return {
+            "total_imports": 0,
+            "analyzed_modules": len(analyzed_modules),
+            "unanalyzed_internal": [],
+            "external_dependencies": [],
+            "stdlib_imports": [],
+            "potential_files_to_analyze": [],
+            "discovery_complete": True,
+        }
+
+    # Every dotted suffix of every analyzed module ("myapp.utils" -> "utils",
+    # "myapp.utils"), so a relative/suffix match is a single set lookup
+    analyzed_suffixes = frozenset(
+        mod.split(".", i)[-1]
+        for mod in analyzed_modules
+        for i in range(mod.count(".") + 1)
+    )
 
     # Extract all imported modules from "imports" edges
     imported_modules = set()
-    for edge in edges:
-        if edge.get("type") == "imports":
-            target = edge.get("target", "")
-            # Extract module name (could be like "module:symbol" or just "module")
-            module_name = target.split(":")[0] if ":" in target else target
-            if module_name:
-                imported_modules.add(module_name)
+    for edge in import_edges:
+        target = edge.get("target", "")
+        # Extract module name (could be like "module:symbol" or just "module")
+        module_name = target.split(":", 1)[0]
+        if module_name:
+            imported_modules.add(module_name)
     
     # Find unanalyzed internal modules
     repo_name = os.path.basename(repo_path)
@@ -573,15 +1310,6 @@ def discover_dependencies(ccg: Dict[str, Any], repo_path: str) -> Dict[str, Any]
     external_deps = set()
     stdlib_imports = set()
     
-    # Common stdlib modules
-    STDLIB_MODULES = {
-        "os", "sys", "re", "json", "time", "datetime", "collections",
-        "itertools", "functools", "pathlib", "typing", "abc", "enum",
-        "logging", "argparse", "configparser", "io", "shutil", "subprocess",
-        "threading", "multiprocessing", "asyncio", "contextlib", "traceback",
-        "unittest", "pytest", "math", "random", "string", "copy", "pickle"
-    }
-    
     potential_files = []
     for module in imported_modules:
         # Normalize relative imports for comparison: ".utils" -> "utils"
@@ -592,39 +1320,26 @@ def discover_dependencies(ccg: Dict[str, Any], repo_path: str) -> Dict[str, Any]
 
         # Skip already analyzed modules (exact match or relative suffix match,
         # e.g. ".utils" resolves once "myapp.utils" has been analyzed)
-        if module in analyzed_modules or base in analyzed_modules:
-            continue
-        if any(a == base or a.endswith("." + base) for a in analyzed_modules):
+        if base in analyzed_suffixes:
             continue
 
-        # Check if it's a standard library module
-        module_root = module.split(".")[0].lstrip(".")
-        if module_root in STDLIB_MODULES:
+        # Check if it's a standard library module (never for relative imports)
+        is_relative = len(base) != len(module)
+        if not is_relative and base.split(".", 1)[0] in STDLIB_MODULES:
             stdlib_imports.add(module)
             continue
 
         # Convert module name to potential file path
         # e.g., "myapp.utils" -> "myapp/utils.py"; ".utils" -> "utils.py"
-        module_path = base.replace(".", "/")
-        potential_py = os.path.join(repo_path, f"{module_path}.py")
-        potential_init = os.path.join(repo_path, module_path, "__init__.py")
+        module_file = _find_module_file(repo_path, base.replace(".", "/"))
 
         # Treat as internal if it's relative, matches the repo name, or maps
         # to an existing file under the repo (covers repos where the package
         # name differs from the repo directory name).
-        is_internal = (
-            module.startswith(".")
-            or module.startswith(repo_name)
-            or os.path.exists(potential_py)
-            or os.path.exists(potential_init)
-        )
-
-        if is_internal:
+        if is_relative or module.startswith(repo_name) or module_file:
             unanalyzed_internal.add(module)
-            if os.path.exists(potential_py):
-                potential_files.append(potential_py)
-            elif os.path.exists(potential_init):
-                potential_files.append(potential_init)
+            if module_file:
+                potential_files.append(module_file)
         else:
             # Likely external dependency
             external_deps.add(module)
@@ -638,3 +1353,21 @@ def discover_dependencies(ccg: Dict[str, Any], repo_path: str) -> Dict[str, Any]
         "potential_files_to_analyze": potential_files,
         "discovery_complete": len(unanalyzed_internal) == 0
     }
+
+
+def dumps_ccg(ccg: Dict[str, Any]) -> str:
+    """Serialize a CCG to indented JSON (with orjson when it's installed)."""
+    # Underscored keys are in-memory indexes over data that's already there
+    ccg = {k: v for k, v in ccg.items() if not k.startswith("_")}
+    if orjson is not None:
+        return orjson.dumps(ccg, option=orjson.OPT_INDENT_2).decode("utf-8")
+    return json.dumps(ccg, indent=2)
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser()
+    ap.add_argument("repo_path")
+    args = ap.parse_args()
+    result = analyze_repo(args.repo_path)
+    print(dumps_ccg(result))
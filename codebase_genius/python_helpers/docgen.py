@@ -4,125 +4,220 @@ Everything in here is about presentation: taking the raw analysis and
 writing it up the way a person would want to read it.
 """
 from __future__ import annotations
+import io
 import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, List, Set
+from typing import Dict, Any, List, Optional, Set, Tuple
 try:
-    from graphviz import Digraph
+    from graphviz import Source
 except Exception:  # pragma: no cover - optional at runtime
-    Digraph = None  # type: ignore
+    Source = None  # type: ignore
+
+# Node ids are "file:name" keys. '|' can't occur in a Python identifier, so
+# a single-character swap keeps ids unique and lets us use str.translate.
+_ESC_TABLE = str.maketrans({":": "|"})
+
+# dot's layered layout gets very slow on big graphs; past this many nodes we
+# switch to sfdp (scalable force-directed). No diagram gets more nodes than
+# the hard cap: the class hierarchy is skipped past it, and the CCG and call
+# graphs (already cut to their max_nodes) never grow beyond it.
+SFDP_MIN_NODES = 200
+MAX_DIAGRAM_NODES = 2000
+
+# Graphviz attributes for each node kind / edge type in the full CCG diagram
+_NODE_STYLE: Dict[str, Dict[str, str]] = {
+    "class": {"shape": "box", "style": "filled", "fillcolor": "lightblue"},
+    "function": {"shape": "ellipse", "style": "filled", "fillcolor": "lightgreen"},
+}
+_DEFAULT_NODE_STYLE: Dict[str, str] = {"shape": "note"}
+_EDGE_STYLE: Dict[str, Dict[str, str]] = {
+    "inherits": {"color": "blue", "style": "dashed"},
+    "calls": {"color": "green"},
+}
+_DEFAULT_EDGE_STYLE: Dict[str, str] = {}
 
 
 def ensure_dir(path: str) -> None:
     Path(path).mkdir(parents=True, exist_ok=True)
 
 
+def _quote(text: str) -> str:
+    """Quote a string as a DOT id/label (newlines become DOT line breaks)."""
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+
+
+def _dot_attrs(attrs: Dict[str, str]) -> str:
+    return " ".join(f"{k}={_quote(v)}" for k, v in attrs.items())
+
+
+# The style tables as ready-made DOT attribute text
+_NODE_ATTRS = {kind: _dot_attrs(style) for kind, style in _NODE_STYLE.items()}
+_DEFAULT_NODE_ATTRS = _dot_attrs(_DEFAULT_NODE_STYLE)
+_EDGE_ATTRS = {etype: _dot_attrs(style) for etype, style in _EDGE_STYLE.items()}
+_DEFAULT_EDGE_ATTRS = _dot_attrs(_DEFAULT_EDGE_STYLE)
+
+
+def _start_graph(
+    comment: str, node_count: int, engine: Optional[str], **graph_attrs: str
+) -> Tuple[io.StringIO, str]:
+    """Open a DOT source buffer for a digraph, choosing the layout engine
+    from the graph size unless the caller asked for one.
+
+    The renderers write DOT text straight into the buffer instead of going
+    through graphviz.Digraph, whose per-node/edge calls re-validate and
+    re-format every attribute in Python.
+    """
+    engine = engine or ("sfdp" if node_count > SFDP_MIN_NODES else "dot")
+    if engine == "sfdp":
+        graph_attrs = {**graph_attrs, "overlap": "prism", "splines": "true"}
+    buf = io.StringIO()
+    buf.write(f"// {comment}\ndigraph {{\n\tgraph [{_dot_attrs(graph_attrs)}]\n")
+    return buf, engine
+
+
+def _write_svg(buf: io.StringIO, engine: str, out_dir: str, name: str) -> str:
+    """Close the DOT source, lay it out as SVG and write out_dir/<name>.svg.
+
+    pipe() streams Graphviz's output straight back to us, so there's no
+    intermediate .gv file to write and clean up, and no rasterizing.
+    Returns the file path, or "" if Graphviz couldn't render it.
+    """
+    buf.write("}\n")
+    try:
+        data = Source(buf.getvalue(), engine=engine).pipe(format="svg")
+    except Exception:
+        return ""
+    ensure_dir(out_dir)
+    out = Path(out_dir) / f"{name}.svg"
+    out.write_bytes(data)
+    return str(out)
+
+
+def _escape_key(key: str) -> str:
+    """Graphviz reads ':' in an edge endpoint as a port, so swap it out."""
+    return key.translate(_ESC_TABLE)
+
+
+# Escaped graphviz ids computed by _analyze_ccg_stats, looked up by the
+# id() of the node / edge dict: {id(node): key}, {id(edge): (source, target)}
+EscapedIds = Tuple[Dict[int, str], Dict[int, Tuple[str, str]]]
+
+
+def _node_key(n: Dict[str, Any], escaped: Optional[EscapedIds] = None) -> str:
+    """The escaped graphviz id for a CCG node (its file:name key).
+
+    Taken from `escaped` when _analyze_ccg_stats already worked it out.
+    """
+    key = escaped[0].get(id(n)) if escaped else None
+    if key is None:
+        key = _escape_key(f"{n.get('file', '')}:{n.get('name', '')}")
+    return key
+
+
+def _escaped_edges(
+    edges: List[Dict[str, Any]],
+    edge_type: Optional[str] = None,
+    escaped: Optional[EscapedIds] = None,
+) -> List[Tuple[str, str, str]]:
+    """Escape each edge's endpoints once, as (source, target, type) tuples,
+    optionally keeping only one edge type."""
+    edge_ids = escaped[1] if escaped else {}
+    out = []
+    for e in edges:
+        et = e.get("type", "")
+        if edge_type is None or et == edge_type:
+            ends = edge_ids.get(id(e))
+            if ends is None:
+                ends = (_escape_key(e.get("source", "")), _escape_key(e.get("target", "")))
+            out.append((ends[0], ends[1], et))
+    return out
+
+
 def render_ccg_diagram(
     ccg: Dict[str, Any],
     out_dir: str,
     name: str = "ccg",
     max_nodes: int = 50,
+    engine: Optional[str] = None,
+    escaped: Optional[EscapedIds] = None,
 ) -> str:
     """Render the full Code Context Graph as a diagram (all nodes and edges)."""
-    if Digraph is None:
+    if Source is None:
         return ""
     
     nodes = ccg.get("nodes", [])
     edges = ccg.get("edges", [])
     
-    # Limit diagram size for readability
-    if len(nodes) > max_nodes:
-        nodes = nodes[:max_nodes]
+    # Limit diagram size for readability; MAX_DIAGRAM_NODES bounds even a
+    # generous max_nodes, since this diagram is truncated rather than skipped
+    limit = min(max_nodes, MAX_DIAGRAM_NODES)
+    if len(nodes) > limit:
+        nodes = nodes[:limit]
     
-    dot = Digraph(comment="Code Context Graph")
-    dot.attr(rankdir='LR', size='12,8')
+    buf, engine = _start_graph("Code Context Graph", len(nodes), engine, rankdir="LR", size="12,8")
+    write = buf.write
     
+    node_keys: Set[str] = set()
     for n in nodes:
-        file_label = Path(n.get("file", "")).name
-        sym = n.get("name", "")
-        kind = n.get("kind", "")
-        key = f"{n.get('file', '')}:{sym}".replace(":", "_COLON_")  # Escape colons for graphviz
-        
+        file_label = os.path.basename(n.get("file", ""))
+        key = _node_key(n, escaped)
+        node_keys.add(key)
         # Style by kind
-        if kind == "class":
-            dot.node(key, label=f"{sym}\n({file_label})", shape="box", style="filled", fillcolor="lightblue")
-        elif kind == "function":
-            dot.node(key, label=f"{sym}\n({file_label})", shape="ellipse", style="filled", fillcolor="lightgreen")
-        else:
-            dot.node(key, label=f"{sym}\n({file_label})", shape="note")
+        label = _quote(f"{n.get('name', '')}\n({file_label})")
+        attrs = _NODE_ATTRS.get(n.get("kind"), _DEFAULT_NODE_ATTRS)
+        write(f"\t{_quote(key)} [label={label} {attrs}]\n")
     
     # Render edges
-    node_keys = {f"{n.get('file', '')}:{n.get('name', '')}".replace(":", "_COLON_") for n in nodes}
-    for e in edges:
-        src = e.get("source", "").replace(":", "_COLON_")
-        tgt = e.get("target", "").replace(":", "_COLON_")
-        et = e.get("type", "")
-        
+    for src, tgt, et in _escaped_edges(edges, escaped=escaped):
         # Only include edges where both nodes are in the diagram
         if src in node_keys and tgt in node_keys:
-            if et == "inherits":
-                dot.edge(src, tgt, label=et, color="blue", style="dashed")
-            elif et == "calls":
-                dot.edge(src, tgt, label=et, color="green")
-            else:
-                dot.edge(src, tgt, label=et)
+            attrs = _EDGE_ATTRS.get(et, _DEFAULT_EDGE_ATTRS)
+            write(f"\t{_quote(src)} -> {_quote(tgt)} [label={_quote(et)} {attrs}]\n")
     
-    ensure_dir(out_dir)
-    path = os.path.join(out_dir, name)
-    dot.format = "png"
-    try:
-        dot.render(path, cleanup=True)
-        return f"{path}.png"
-    except Exception:
-        return ""
+    return _write_svg(buf, engine, out_dir, name)
 
 
 def render_class_hierarchy_diagram(
     ccg: Dict[str, Any],
     out_dir: str,
     name: str = "class_hierarchy",
+    engine: Optional[str] = None,
+    escaped: Optional[EscapedIds] = None,
 ) -> str:
     """Render the class inheritance hierarchy as a diagram."""
-    if Digraph is None:
+    if Source is None:
         return ""
     
     nodes = ccg.get("nodes", [])
     edges = ccg.get("edges", [])
     
     # Filter to classes only
-    classes = {f"{n.get('file', '')}:{n.get('name', '')}": n 
-               for n in nodes if n.get("kind") == "class"}
+    classes = {_node_key(n, escaped): n for n in nodes if n.get("kind") == "class"}
     
     if not classes:
         return ""
     
-    inherit_edges = [e for e in edges if e.get("type") == "inherits"]
+    inherit_edges = _escaped_edges(edges, "inherits", escaped)
     
-    if not inherit_edges:
+    if not inherit_edges or len(classes) > MAX_DIAGRAM_NODES:
         return ""
     
-    dot = Digraph(comment="Class Hierarchy")
-    dot.attr(rankdir='TB', size='10,10')
+    buf, engine = _start_graph("Class Hierarchy", len(classes), engine, rankdir="TB", size="10,10")
+    write = buf.write
     
     for key, cls in classes.items():
         sym = cls.get("name", "")
-        file_label = Path(cls.get("file", "")).name
-        dot.node(key, label=f"{sym}\n[{file_label}]", shape="box", style="filled", fillcolor="lightblue")
+        file_label = os.path.basename(cls.get("file", ""))
+        label = _quote(f"{sym}\n[{file_label}]")
+        write(f'\t{_quote(key)} [label={label} shape="box" style="filled" fillcolor="lightblue"]\n')
     
-    for e in inherit_edges:
-        src = e.get("source", "")
-        tgt = e.get("target", "")
+    for src, tgt, _ in inherit_edges:
         if src in classes and tgt in classes:
-            dot.edge(src, tgt, label="inherits", color="blue", style="bold")
+            write(f'\t{_quote(src)} -> {_quote(tgt)} [label="inherits" color="blue" style="bold"]\n')
     
-    ensure_dir(out_dir)
-    path = os.path.join(out_dir, name)
-    dot.format = "png"
-    try:
-        dot.render(path, cleanup=True)
-        return f"{path}.png"
-    except Exception:
-        return ""
+    return _write_svg(buf, engine, out_dir, name)
 
 
 def render_call_graph_diagram(
@@ -130,41 +225,45 @@ def render_call_graph_diagram(
     out_dir: str,
     name: str = "call_graph",
     max_nodes: int = 30,
+    engine: Optional[str] = None,
+    escaped: Optional[EscapedIds] = None,
 ) -> str:
     """Render the function call graph as a diagram."""
-    if Digraph is None:
+    if Source is None:
         return ""
     
     edges = ccg.get("edges", [])
-    call_edges = [e for e in edges if e.get("type") == "calls"]
+    call_edges = _escaped_edges(edges, "calls", escaped)
     
     if not call_edges:
         return ""
     
     # Get all nodes involved in calls
     call_nodes: Set[str] = set()
-    for e in call_edges:
-        call_nodes.add(e.get("source", "").replace(":", "_COLON_"))
-        call_nodes.add(e.get("target", "").replace(":", "_COLON_"))
-    
-    # Limit for readability
-    if len(call_nodes) > max_nodes:
-        call_nodes = set(list(call_nodes)[:max_nodes])
-        call_edges = [e for e in call_edges 
-                      if e.get("source", "").replace(":", "_COLON_") in call_nodes 
-                      and e.get("target", "").replace(":", "_COLON_") in call_nodes]
+    for src, tgt, _ in call_edges:
+        call_nodes.add(src)
+        call_nodes.add(tgt)
+    
+    # Limit for readability (MAX_DIAGRAM_NODES bounds even a generous max_nodes)
+    limit = min(max_nodes, MAX_DIAGRAM_NODES)
+    if len(call_nodes) > limit:
+        call_nodes = set(list(call_nodes)[:limit])
+        call_edges = [
+            (src, tgt, et) for src, tgt, et in call_edges
+            if src in call_nodes and tgt in call_nodes
+        ]
     
     nodes = ccg.get("nodes", [])
-    node_map = {f"{n.get('file', '')}:{n.get('name', '')}".replace(":", "_COLON_"): n for n in nodes}
+    node_map = {_node_key(n, escaped): n for n in nodes}
     
-    dot = Digraph(comment="Call Graph")
-    dot.attr(rankdir='LR', size='12,8')
+    buf, engine = _start_graph("Call Graph", len(call_nodes), engine, rankdir="LR", size="12,8")
+    write = buf.write
     
     for key in call_nodes:
         if key in node_map:
             n = node_map[key]
             sym = n.get("name", "")
-            file_label = Path(n.get("file", "")).name
+            file_label = os.path.basename(n.get("file", ""))
             complexity = n.get("complexity", 1)
             
             # Color by complexity
@@ -175,68 +274,83 @@ def render_call_graph_diagram(
             else:
                 color = "lightgreen"
             
-            dot.node(key, label=f"{sym}\n({file_label})\ncx={complexity}", 
-                    shape="ellipse", style="filled", fillcolor=color)
+            label = _quote(f"{sym}\n({file_label})\ncx={complexity}")
+            write(f'\t{_quote(key)} [label={label} shape="ellipse" style="filled" fillcolor="{color}"]\n')
     
-    for e in call_edges:
-        src = e.get("source", "").replace(":", "_COLON_")
-        tgt = e.get("target", "").replace(":", "_COLON_")
+    for src, tgt, _ in call_edges:
         if src in call_nodes and tgt in call_nodes:
-            dot.edge(src, tgt, color="green")
+            write(f'\t{_quote(src)} -> {_quote(tgt)} [color="green"]\n')
     
-    ensure_dir(out_dir)
-    path = os.path.join(out_dir, name)
-    dot.format = "png"
-    try:
-        dot.render(path, cleanup=True)
-        return f"{path}.png"
-    except Exception:
-        return ""
+    return _write_svg(buf, engine, out_dir, name)
 
 
 def _analyze_ccg_stats(ccg: Dict[str, Any]) -> Dict[str, Any]:
-    """Extract statistics and insights from CCG."""
+    """Extract statistics and insights from CCG.
+
+    While it's visiting every node and edge anyway, it also works out their
+    escaped graphviz ids (returned as "escaped", keyed by object id) so the
+    diagram renderers don't have to rebuild them. The CCG itself is left
+    untouched.
+    """
     nodes = ccg.get("nodes", [])
     edges = ccg.get("edges", [])
     
-    stats = {
+    # One sweep over the nodes and one over the edges, bucketing as we go
+    classes: List[Dict[str, Any]] = []
+    functions: List[Dict[str, Any]] = []
+    modules: List[Dict[str, Any]] = []
+    high_complexity: List[Dict[str, Any]] = []
+    node_ids: Dict[int, str] = {}
+    for n in nodes:
+        node_ids[id(n)] = _escape_key(f"{n.get('file', '')}:{n.get('name', '')}")
+        kind = n.get("kind")
+        if kind == "class":
+            classes.append(n)
+        elif kind == "function":
+            functions.append(n)
+            if n.get("complexity", 0) > 10:
+                high_complexity.append(n)
+        elif kind == "module":
+            modules.append(n)
+    
+    call_edges: List[Dict[str, Any]] = []
+    inherit_edges: List[Dict[str, Any]] = []
+    import_edges: List[Dict[str, Any]] = []
+    base_classes: Set[str] = set()
+    edge_ids: Dict[int, Tuple[str, str]] = {}
+    for e in edges:
+        edge_ids[id(e)] = (_escape_key(e.get("source", "")), _escape_key(e.get("target", "")))
+        etype = e.get("type")
+        if etype == "calls":
+            call_edges.append(e)
+        elif etype == "inherits":
+            inherit_edges.append(e)
+            base_classes.add(e.get("target", ""))
+        elif etype == "imports":
+            import_edges.append(e)
+    
+    return {
         "total_nodes": len(nodes),
         "total_edges": len(edges),
-        "classes": [n for n in nodes if n.get("kind") == "class"],
-        "functions": [n for n in nodes if n.get("kind") == "function"],
-        "modules": [n for n in nodes if n.get("kind") == "module"],
-        "call_edges": [e for e in edges if e.get("type") == "calls"],
-        "inherit_edges": [e for e in edges if e.get("type") == "inherits"],
-        "import_edges": [e for e in edges if e.get("type") == "imports"],
+        "classes": classes,
+        "functions": functions,
+        "modules": modules,
+        "call_edges": call_edges,
+        "inherit_edges": inherit_edges,
+        "import_edges": import_edges,
+        # Find high-complexity functions
+        "high_complexity": sorted(
+            high_complexity,
+            key=lambda x: x.get("complexity", 0),
+            reverse=True
+        )[:10],
+        # Find most-called functions (hotspots); most_common(10) picks the top
+        # ten with a heap instead of sorting every target
+        "hotspots": Counter(e.get("target", "") for e in call_edges).most_common(10),
+        # Find base classes (classes that are inherited from)
+        "base_classes": list(base_classes),
+        "escaped": (node_ids, edge_ids),
     }
-    
-    # Find high-complexity functions
-    stats["high_complexity"] = sorted(
-        [f for f in stats["functions"] if f.get("complexity", 0) > 10],
-        key=lambda x: x.get("complexity", 0),
-        reverse=True
-    )[:10]
-    
-    # Find most-called functions (hotspots)
-    call_targets: Dict[str, int] = {}
-    for e in stats["call_edges"]:
-        tgt = e.get("target", "")
-        call_targets[tgt] = call_targets.get(tgt, 0) + 1
-    
-    stats["hotspots"] = sorted(
-        call_targets.items(),
-        key=lambda x: x[1],
-        reverse=True
-    )[:10]
-    
-    # Find base classes (classes that are inherited from)
-    base_classes: Set[str] = set()
-    for e in stats["inherit_edges"]:
-        base_classes.add(e.get("target", ""))
-    
-    stats["base_classes"] = list(base_classes)
-    
-    return stats
 
 
 def _format_installation_section(repo_url: str, file_tree: Dict[str, Any]) -> str:
@@ -250,20 +364,18 @@ def _format_installation_section(repo_url: str, file_tree: Dict[str, Any]) -> st
     has_setup_py = False
     has_pyproject = False
     
-    def check_files(tree: Dict[str, Any]) -> None:
-        nonlocal has_requirements, has_setup_py, has_pyproject
-        path = tree.get("path", "")
+    # Paths are relative to the repo root, so only the root's own children
+    # can ever match; no need to walk the rest of the tree
+    for child in file_tree.get("children", []) or []:
+        path = child.get("path", "")
         if path == "requirements.txt":
             has_requirements = True
         elif path == "setup.py":
             has_setup_py = True
         elif path == "pyproject.toml":
             has_pyproject = True
-        
-        for child in tree.get("children", []) or []:
-            check_files(child)
-    
-    check_files(file_tree)
+        if has_requirements and has_setup_py and has_pyproject:
+            break
     
     # Clone instruction
     lines.append("Clone the repository:\n")
@@ -309,8 +421,8 @@ def _format_usage_section(ccg_stats: Dict[str, Any]) -> str:
     if entry_points:
         lines.append("Here are the entry points we spotted:\n")
         for ep in entry_points[:3]:
-            file_path = Path(ep.get("file", ""))
-            lines.append(f"- `{file_path.name}`: {ep.get('name', 'N/A')}")
+            file_name = os.path.basename(ep.get("file", ""))
+            lines.append(f"- `{file_name}`: {ep.get('name', 'N/A')}")
         lines.append("")
     else:
         lines.append("No obvious entry point stood out — check the repository's README for usage instructions.\n")
@@ -337,7 +449,7 @@ def _format_api_reference_section(ccg_stats: Dict[str, Any]) -> str:
             class_by_file[fpath].append(cls)
         
         for fpath in sorted(class_by_file.keys())[:10]:  # Limit to 10 files
-            file_label = Path(fpath).name
+            file_label = os.path.basename(fpath)
             lines.append(f"#### {file_label}\n")
             for cls in class_by_file[fpath][:5]:  # Limit to 5 classes per file
                 name = cls.get("name", "")
@@ -352,9 +464,9 @@ def _format_api_reference_section(ccg_stats: Dict[str, Any]) -> str:
                      "and may be worth splitting up:\n")
         for func in high_complexity[:10]:
             name = func.get("name", "")
-            file_path = Path(func.get("file", ""))
+            file_name = os.path.basename(func.get("file", ""))
             complexity = func.get("complexity", 0)
-            lines.append(f"- `{name}` in `{file_path.name}` (complexity: {complexity})")
+            lines.append(f"- `{name}` in `{file_name}` (complexity: {complexity})")
         lines.append("")
     
     hotspots = ccg_stats.get("hotspots", [])
@@ -412,72 +524,101 @@ def generate_markdown(
     # Analyze CCG for insights
     ccg_stats = _analyze_ccg_stats(ccg)
     
-    # Generate diagrams
-    ccg_diagram = render_ccg_diagram(ccg, out_dir, max_nodes=40)
-    class_diagram = render_class_hierarchy_diagram(ccg, out_dir)
-    call_diagram = render_call_graph_diagram(ccg, out_dir, max_nodes=25)
-    
-    with open(md_path, "w", encoding="utf-8") as f:
-        # Title
-        repo_name = repo_url.split("/")[-1].replace(".git", "")
-        f.write(f"# {repo_name} – Documentation\n\n")
-        f.write(f"*Auto-generated by Codebase Genius for [{repo_url}]({repo_url})*\n\n")
-        f.write("---\n\n")
-        
-        # Overview
-        f.write("## Overview\n\n")
-        f.write(readme_summary + "\n\n")
-        
-        # Installation
-        f.write(_format_installation_section(repo_url, file_tree))
-        f.write("\n")
-        
-        # Usage
-        f.write(_format_usage_section(ccg_stats))
-        f.write("\n")
-        
-        # Architecture
-        f.write(_format_architecture_section(ccg_stats))
-        
-        # Diagrams section
-        f.write("### Code Diagrams\n\n")
-        
-        if class_diagram:
-            f.write("#### Class Hierarchy\n\n")
-            f.write(f"![Class Hierarchy]({Path(class_diagram).name})\n\n")
-        
-        if call_diagram:
-            f.write("#### Call Graph\n\n")
-            f.write(f"![Call Graph]({Path(call_diagram).name})\n\n")
-        
-        if ccg_diagram:
-            f.write("#### Full Code Context Graph\n\n")
-            f.write(f"![CCG Diagram]({Path(ccg_diagram).name})\n\n")
-        
-        # API Reference
-        f.write(_format_api_reference_section(ccg_stats))
-        
-        # File Tree
-        f.write("## Project Structure\n\n")
-        f.write("```\n")
-        f.write(_format_tree(file_tree))
-        f.write("\n```\n\n")
-        
-        # Footer
-        f.write("---\n\n")
-        f.write("*Generated with Codebase Genius — an AI-powered documentation generator.*\n")
+    # The class and call diagrams only need one edge type each; hand them
+    # the buckets the stats pass already made instead of every edge
+    nodes = ccg.get("nodes", [])
+    inherit_ccg = {"nodes": nodes, "edges": ccg_stats["inherit_edges"]}
+    call_ccg = {"nodes": nodes, "edges": ccg_stats["call_edges"]}
+    
+    # Generate diagrams. Each render mostly waits on a Graphviz subprocess,
+    # so running the three side by side overlaps the layout work.
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        escaped = ccg_stats["escaped"]
+        ccg_future = pool.submit(
+            render_ccg_diagram, ccg, out_dir, max_nodes=40, escaped=escaped
+        )
+        class_future = pool.submit(
+            render_class_hierarchy_diagram, inherit_ccg, out_dir, escaped=escaped
+        )
+        call_future = pool.submit(
+            render_call_graph_diagram, call_ccg, out_dir, max_nodes=25, escaped=escaped
+        )
+        ccg_diagram = ccg_future.result()
+        class_diagram = class_future.result()
+        call_diagram = call_future.result()
+    
+    # Assemble the whole document in memory and write it out in one go
+    parts: List[str] = []
+    write = parts.append
+    
+    # Title
+    repo_name = repo_url.split("/")[-1].replace(".git", "")
+    write(f"# {repo_name} – Documentation\n\n")
+    write(f"*Auto-generated by Codebase Genius for [{repo_url}]({repo_url})*\n\n")
+    write("---\n\n")
+    
+    # Overview
+    write("## Overview\n\n")
+    write(readme_summary + "\n\n")
+    
+    # Installation
+    write(_format_installation_section(repo_url, file_tree))
+    write("\n")
+    
+    # Usage
+    write(_format_usage_section(ccg_stats))
+    write("\n")
+    
+    # Architecture
+    write(_format_architecture_section(ccg_stats))
+    
+    # Diagrams section
+    write("### Code Diagrams\n\n")
+    
+    if class_diagram:
+        write("#### Class Hierarchy\n\n")
+        write(f"![Class Hierarchy]({os.path.basename(class_diagram)})\n\n")
+    
+    if call_diagram:
+        write("#### Call Graph\n\n")
+        write(f"![Call Graph]({os.path.basename(call_diagram)})\n\n")
+    
+    if ccg_diagram:
+        write("#### Full Code Context Graph\n\n")
+        write(f"![CCG Diagram]({os.path.basename(ccg_diagram)})\n\n")
+    
+    # API Reference
+    write(_format_api_reference_section(ccg_stats))
+    
+    # File Tree
+    write("## Project Structure\n\n")
+    write("```\n")
+    write(_format_tree(file_tree))
+    write("\n```\n\n")
+    
+    # Footer
+    write("---\n\n")
+    write("*Generated with Codebase Genius — an AI-powered documentation generator.*\n")
+
+    Path(md_path).write_text("".join(parts), encoding="utf-8")
     
     return md_path
 
 
 def _format_tree(tree: Dict[str, Any], indent: int = 0) -> str:
-    if not tree:
-        return "<empty>"
-    lines = []
-    prefix = "  " * indent
-    path = tree.get("path", ".")
-    t = tree.get("type", "dir")
-    lines.append(f"{prefix}{path}/" if t == "dir" else f"{prefix}{path}")
-    for ch in tree.get("children", []) or []:
-        lines.append(_format_tree(ch, indent + 1))
+    # Depth-first with an explicit stack (children pushed in reverse so they
+    # come out in order), collecting every line into one list
+    lines: List[str] = []
+    stack = [(tree, indent)]
+    while stack:
+        node, depth = stack.pop()
+        if not node:
+            lines.append("<empty>")
+            continue
+        prefix = "  " * depth
+        path = node.get("path", ".")
+        t = node.get("type", "dir")
+        lines.append(f"{prefix}{path}/" if t == "dir" else f"{prefix}{path}")
+        for ch in reversed(node.get("children", []) or []):
+            stack.append((ch, depth + 1))
     return "\n".join(lines)
@@ -4,16 +4,42 @@ If you've set GEMINI_API_KEY and USE_LLM=1 we'll use Gemini to write a nice
 summary; otherwise we fall back to a simple truncation.
 """
 from __future__ import annotations
+import functools
+import hashlib
 import os
-from typing import Optional
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+from .llm_cache import cache_key, load_response, store_response
 
 try:
     import google.genai as genai  # type: ignore
+    from google.genai import types as genai_types  # type: ignore
     HAS_GEMINI = True
 except Exception:  # pragma: no cover
     HAS_GEMINI = False
 
 DEFAULT_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+# Seconds to wait on a Gemini request before giving up on it
+LLM_TIMEOUT = 10
+# Characters of (cleaned) README we send in the prompt
+PROMPT_CHARS = 6000
+
+# Markdown that costs tokens without saying anything about the project
+_CODE_FENCE_RE = re.compile(r"```.*?```", re.S)
+_HTML_COMMENT_RE = re.compile(r"<!--.*?-->", re.S)
+_IMAGE_RE = re.compile(r"\[?!\[[^\]]*\]\([^)]*\)(?:\]\([^)]*\))?")  # images, linked badges
+_HTML_TAG_RE = re.compile(r"</?[a-zA-Z][^>]*>")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n+")
+_SPACES_RE = re.compile(r"[ \t]+")
+
+# Summaries we've already paid an API call for, least recently used first.
+# Keyed by a digest of the README rather than the text itself, so the
+# cache stays small and lookups don't hash whole READMEs.
+_SUMMARY_CACHE: "OrderedDict[Tuple[bytes, str, int], str]" = OrderedDict()
+_SUMMARY_CACHE_SIZE = 256
+_SUMMARY_CACHE_LOCK = threading.Lock()
 
 
 def _is_truthy(val: Optional[str]) -> bool:
@@ -26,27 +52,80 @@ def summarize_readme_llm(text: str, max_len: int = 500) -> str:
     """Summarize a README with Gemini, or fall back to plain truncation."""
     if not text:
         return "No README content found."
+    # Already short enough (or just whitespace): nothing worth an API call
+    cleaned = " ".join(text.split())
+    if len(cleaned) <= max_len:
+        return cleaned
     if not _is_truthy(os.getenv("USE_LLM")):
         return _fallback(text, max_len)
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key or not HAS_GEMINI:
         return _fallback(text, max_len)
+    key = (
+        hashlib.blake2b(text.encode("utf-8", errors="ignore"), digest_size=16).digest(),
+        DEFAULT_MODEL,
+        max_len,
+    )
+    with _SUMMARY_CACHE_LOCK:
+        cached = _SUMMARY_CACHE.get(key)
+        if cached is not None:
+            _SUMMARY_CACHE.move_to_end(key)
+            return cached
     try:
-        genai.configure(api_key=api_key)
         prompt = (
             "Write a short, friendly overview of this project based on its README. "
-            "Keep it plain and honest — skip the marketing fluff.\n\n" + text[:6000]
+            "Keep it plain and honest — skip the marketing fluff.\n\n"
+            + _strip_md(text)[:PROMPT_CHARS]
         )
-        model = genai.GenerativeModel(DEFAULT_MODEL)
-        resp = model.generate_content(prompt)
-        out = resp.text.strip() if hasattr(resp, "text") and resp.text else ""
-        if not out:
-            return _fallback(text, max_len)
+        # Answers from earlier runs live on disk; only ask Gemini on a miss
+        disk_key = cache_key(DEFAULT_MODEL, prompt)
+        out = load_response(disk_key)
+        if out is None:
+            resp = _gemini_client(api_key).models.generate_content(
+                model=DEFAULT_MODEL, contents=prompt
+            )
+            out = resp.text.strip() if hasattr(resp, "text") and resp.text else ""
+            if not out:
+                return _fallback(text, max_len)
+            store_response(disk_key, out)
         # Trim overly long response
-        return out[:max_len] + ("..." if len(out) > max_len else "")
+        summary = out[:max_len] + ("..." if len(out) > max_len else "")
     except Exception:
         return _fallback(text, max_len)
 
+    # Only real LLM summaries are remembered; a failed call may succeed later
+    with _SUMMARY_CACHE_LOCK:
+        _SUMMARY_CACHE[key] = summary
+        if len(_SUMMARY_CACHE) > _SUMMARY_CACHE_SIZE:
+            _SUMMARY_CACHE.popitem(last=False)
+    return summary
+
+
+@functools.lru_cache(maxsize=4)
+def _gemini_client(api_key: str):
+    """Build the Gemini client once per API key.
+
+    Creating one on every request redid the client setup (and threw away
+    its connection) each time; the client is safe to share between the
+    threads that summarize READMEs. Every request it sends gives up after
+    LLM_TIMEOUT (HttpOptions takes milliseconds).
+    """
+    return genai.Client(
+        api_key=api_key,
+        http_options=genai_types.HttpOptions(timeout=LLM_TIMEOUT * 1000),
+    )
+
+
+def _strip_md(text: str) -> str:
+    """Drop code blocks, comments, badges/images and HTML from a README and
+    squeeze the whitespace, so the prompt spends its characters on prose."""
+    text = _CODE_FENCE_RE.sub("", text)
+    text = _HTML_COMMENT_RE.sub("", text)
+    text = _IMAGE_RE.sub("", text)
+    text = _HTML_TAG_RE.sub("", text)
+    text = _SPACES_RE.sub(" ", text)
+    return _BLANK_LINES_RE.sub("\n\n", text).strip()
+
 
 def _fallback(text: str, max_len: int) -> str:
     cleaned = " ".join(text.split())
@@ -0,0 +1,48 @@
+"""On-disk cache for LLM responses.
+
+Docs for the same repos get regenerated over and over during development;
+there's no reason to wait on (or pay for) Gemini again for a prompt it has
+already answered. Responses are stored as small JSON files under
+LLM_CACHE_DIR, keyed by a hash of the model and the prompt.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+from typing import Optional
+from . import cache_dir
+
+LLM_CACHE_DIR = cache_dir("llm")
+# Bump whenever what we store (or how we key it) changes
+_LLM_CACHE_VERSION = 1
+
+
+def cache_key(model: str, prompt: str) -> str:
+    """Stable key for one prompt sent to one model."""
+    hasher = hashlib.sha256(f"{_LLM_CACHE_VERSION}:{model}:".encode())
+    hasher.update(prompt.encode("utf-8", errors="ignore"))
+    return hasher.hexdigest()
+
+
+def load_response(key: str) -> Optional[str]:
+    """Previously stored response text for `key`, or None."""
+    try:
+        with open(os.path.join(LLM_CACHE_DIR, f"{key}.json"), encoding="utf-8") as f:
+            text = json.load(f).get("text")
+    except Exception:
+        return None
+    return text if isinstance(text, str) and text else None
+
+
+def store_response(key: str, text: str) -> None:
+    """Remember a response; failures to write are silently ignored."""
+    cache_path = os.path.join(LLM_CACHE_DIR, f"{key}.json")
+    try:
+        os.makedirs(LLM_CACHE_DIR, exist_ok=True)
+        # Write to a temp file first so concurrent runs never see half an entry
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"text": text}, f)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass  # A read-only disk just means no caching
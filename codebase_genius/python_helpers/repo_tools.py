@@ -2,28 +2,55 @@
 summarizing their READMEs. These are the plumbing behind the scenes.
 """
 from __future__ import annotations
+import functools
 import os
 import re
 import json
 import shutil
 import tempfile
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional
 from dataclasses import dataclass
 from urllib.parse import urlparse
-from .llm import summarize_readme_llm  # LLM optional summarizer
-from git import Repo, GitCommandError  # type: ignore
-
-IGNORE_DIRS = {
-    ".git",
-    "__pycache__",
-    "node_modules",
-    ".venv",
-    "venv",
-    ".mypy_cache",
-}
+from . import cache_dir
+from .analyzer import IGNORE_DIRS
+from .llm import summarize_readme_llm, _fallback  # LLM optional summarizer
+from git import Repo, GitCommandError, InvalidGitRepositoryError  # type: ignore
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, so clones there go unlocked
+    fcntl = None  # type: ignore
+
 TEXT_README_CANDIDATES = ["README.md", "README.rst", "README.txt"]
+# File names that usually mark an entry point, for find_important_files
+PRIORITY_FILES = frozenset({
+    "main.py",
+    "app.py",
+    "__main__.py",
+    "__init__.py",
+    "cli.py",
+    "server.py",
+    "run.py",
+    "manage.py",
+})
+# How long repo_map_workflow waits on the README summary before settling
+# for the plain truncated version
+SUMMARY_TIMEOUT = 15
+SUPPORTED_HOSTS = frozenset({"github.com", "gitlab.com", "bitbucket.org"})
+# Only the tip of the default branch: no history, other branches, or tags.
+# (No --filter=blob:none partial clone: the analyzer reads every source file,
+# which would then fetch blobs one at a time.)
+CLONE_OPTIONS = ["--depth=1", "--single-branch", "--no-tags"]
+# Owner and repo names: letters, digits, underscore, dot, dash
+_NAME_RE = re.compile(r"^[\w.-]+$")
+# Per-commit snapshots of cached clones that no caller has been handed for
+# this long are removed (see _commit_snapshot); far longer than any analysis
+SNAPSHOT_MAX_AGE = 60 * 60
 
 
 def validate_repo_url(repo_url: str) -> Dict[str, Any]:
@@ -34,7 +61,14 @@ def validate_repo_url(repo_url: str) -> Dict[str, Any]:
     """
     if not repo_url or not isinstance(repo_url, str):
         return {"valid": False, "error": "URL must be a non-empty string"}
-    
+    # The same URL is usually checked more than once per request (API/CLI
+    # entry point, then clone_repo); hand out a copy of the cached result
+    # so callers can't mutate it
+    return dict(_validate_repo_url(repo_url))
+
+
+@functools.lru_cache(maxsize=512)
+def _validate_repo_url(repo_url: str) -> Dict[str, Any]:
     # Normalize URL
     url = repo_url.strip().rstrip("/")
     
@@ -45,11 +79,10 @@ def validate_repo_url(repo_url: str) -> Dict[str, Any]:
         return {"valid": False, "error": f"Invalid URL format: {e}"}
     
     # Check for supported hosts
-    supported_hosts = ["github.com", "gitlab.com", "bitbucket.org"]
-    if parsed.netloc not in supported_hosts:
+    if parsed.netloc not in SUPPORTED_HOSTS:
         return {
             "valid": False, 
-            "error": f"Unsupported host: {parsed.netloc}. Supported: {', '.join(supported_hosts)}"
+            "error": f"Unsupported host: {parsed.netloc}. Supported: {', '.join(sorted(SUPPORTED_HOSTS))}"
         }
     
     # GitHub-specific validation
@@ -63,7 +96,7 @@ def validate_repo_url(repo_url: str) -> Dict[str, Any]:
             }
         
         owner, repo = path_parts[0], path_parts[1]
-        if not re.match(r"^[\w.-]+$", owner) or not re.match(r"^[\w.-]+$", repo.replace(".git", "")):
+        if not _is_plain_name(owner) or not _is_plain_name(repo.replace(".git", "")):
             return {
                 "valid": False,
                 "error": f"Invalid owner/repo name: {owner}/{repo}"
@@ -73,10 +106,22 @@ def validate_repo_url(repo_url: str) -> Dict[str, Any]:
         normalized = f"https://github.com/{owner}/{repo.replace('.git', '')}"
         return {"valid": True, "normalized_url": normalized}
     
-    # Generic validation for other hosts
+    # Generic validation for other hosts. Nested groups are fine
+    # (gitlab.com/group/sub/repo), but every segment ends up in a cache path
+    path_parts = [p for p in parsed.path.split("/") if p]
+    if len(path_parts) < 2 or not all(_is_plain_name(p) for p in path_parts):
+        return {
+            "valid": False,
+            "error": f"Invalid repository path: {parsed.path}"
+        }
     return {"valid": True, "normalized_url": url}
 
 
+def _is_plain_name(part: str) -> bool:
+    """An owner/group/repo name: _NAME_RE, and not just dots ('.', '..')."""
+    return bool(_NAME_RE.match(part)) and part.strip(".") != ""
+
+
  
 @dataclass
 class FileNode:
@@ -95,6 +140,103 @@ class FileNode:
         }
 
 
+def repo_cache_dir(repo_url: str) -> str:
+    """Directory that holds the cached clone of `repo_url`
+    (repos/host/owner/... under the cache root)."""
+    root = cache_dir("repos")
+    parsed = urlparse(repo_url)
+    owner_parts = [p for p in parsed.path.split("/") if p][:-1]
+    if parsed.netloc not in SUPPORTED_HOSTS or not all(_is_plain_name(p) for p in owner_parts):
+        raise ValueError(f"Can't cache {repo_url}: unexpected host or path")
+    return os.path.join(root, parsed.netloc, *owner_parts)
+
+
+@contextmanager
+def _repo_lock(dest: str):
+    """Hold an exclusive lock on the checkout at `dest` (via a `dest.lock`
+    file next to it), so concurrent requests for the same repo take turns
+    cloning or refreshing it instead of tripping over each other."""
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+    with open(dest + ".lock", "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _fresh_clone(repo_url: str, dest: str) -> None:
+    """Clone into a scratch dir beside `dest` and move it into place, so a
+    failed clone never leaves a half-written checkout at `dest`."""
+    parent, name = os.path.split(dest)
+    tmp_dest = tempfile.mkdtemp(prefix=f".{name}.", dir=parent)
+    try:
+        Repo.clone_from(repo_url, tmp_dest, multi_options=CLONE_OPTIONS)
+        if os.path.exists(dest):
+            # Not a usable checkout (we only get here when opening it
+            # failed); swap it out rather than cloning over it
+            stale = tempfile.mkdtemp(prefix=f".{name}.stale.", dir=parent)
+            os.replace(dest, os.path.join(stale, name))
+            shutil.rmtree(stale, ignore_errors=True)
+        os.replace(tmp_dest, dest)
+    finally:
+        if os.path.exists(tmp_dest):
+            shutil.rmtree(tmp_dest, ignore_errors=True)
+
+
+def _refresh_checkout(dest: str) -> None:
+    """Move an existing checkout to the remote's current HEAD."""
+    # Fetch just the tip commit and move the work tree to it (a pull
+    # would deepen the history and try to merge)
+    repo = Repo(dest)
+    # ls-remote is one small round trip; skip the fetch entirely when we
+    # already have the remote's HEAD
+    remote_head = repo.git.ls_remote("origin", "HEAD").split()
+    if remote_head and remote_head[0] == repo.head.commit.hexsha:
+        return
+    repo.remotes.origin.fetch(depth=1, no_tags=True)
+    repo.git.reset("--hard", "FETCH_HEAD")
+
+
+def _commit_snapshot(dest: str) -> str:
+    """A worktree of the commit checked out at `dest`, which nothing moves.
+
+    The cached clone itself is reset whenever upstream changes, which would
+    swap files out from under an analysis still reading it; callers get
+    one worktree per commit instead. Snapshots nobody has been handed for
+    SNAPSHOT_MAX_AGE are removed. Call with dest's lock held.
+    """
+    parent, name = os.path.split(dest)
+    repo = Repo(dest)
+    sha = repo.head.commit.hexsha
+    snapshots = os.path.join(parent, f".{name}.snapshots")
+    path = os.path.join(snapshots, sha, name)
+    if not os.path.isdir(path):
+        try:
+            repo.git.worktree("add", "--detach", path, sha)
+        except GitCommandError:
+            # Clear out whatever a failed (or earlier crashed) add left behind
+            shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+            repo.git.worktree("prune")
+            raise
+    # Marks the snapshot as recently handed out
+    os.utime(os.path.dirname(path))
+
+    cutoff = time.time() - SNAPSHOT_MAX_AGE
+    removed = False
+    with os.scandir(snapshots) as it:
+        for entry in it:
+            if entry.name != sha and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed = True
+    if removed:
+        repo.git.worktree("prune")
+    return path
+
+
 def clone_repo(
     repo_url: str,
     base_dir: Optional[str] = None,
@@ -103,6 +245,13 @@ def clone_repo(
 ) -> str:
     """Clone a repo (shallow, with a couple of retries).
     Returns the local path; raises RuntimeError if it can't be done.
+
+    Without a base_dir the clone goes in the shared cache (see
+    repo_cache_dir), so later runs only fetch what changed upstream, or
+    nothing at all if the remote HEAD hasn't moved. Concurrent calls for
+    the same repo are serialized on a lock file next to the checkout, and
+    the path returned is a per-commit snapshot that later refreshes leave
+    alone (see _commit_snapshot).
     """
     # Validate URL first
     validation = validate_repo_url(repo_url)
@@ -111,19 +260,31 @@ def clone_repo(
     
     repo_url = validation["normalized_url"]
     
-    target_base = base_dir or tempfile.mkdtemp(prefix="codegenius_")
+    target_base = base_dir
+    shared = False
+    if not target_base:
+        try:
+            target_base = repo_cache_dir(repo_url)
+            os.makedirs(target_base, exist_ok=True)
+            shared = True
+        except OSError:
+            # No writable cache location; fall back to a throwaway clone
+            target_base = tempfile.mkdtemp(prefix="codegenius_")
     repo_name = repo_url.rstrip("/").split("/")[-1].replace(".git", "")
     dest = os.path.join(target_base, repo_name)
     last_err: Optional[Exception] = None
     
     for attempt in range(retries + 1):
         try:
-            if os.path.exists(dest):
-                # Attempt pull instead of reclone
-                repo = Repo(dest)
-                repo.remotes.origin.pull()
-                return dest
-            Repo.clone_from(repo_url, dest, depth=1)
+            with _repo_lock(dest):
+                try:
+                    # Refresh the existing checkout instead of recloning
+                    _refresh_checkout(dest)
+                except (InvalidGitRepositoryError, OSError, ValueError):
+                    # Missing, or not a git checkout (e.g. left by a crash)
+                    _fresh_clone(repo_url, dest)
+                if shared:
+                    return _commit_snapshot(dest)
             return dest
         except GitCommandError as e:
             last_err = e
@@ -133,8 +294,6 @@ def clone_repo(
             elif "Repository not found" in str(e) or "not found" in str(e).lower():
                 raise RuntimeError(f"Couldn't find that repository: {repo_url}")
             
-            if os.path.exists(dest):
-                shutil.rmtree(dest, ignore_errors=True)
             if attempt < retries:
                 time.sleep(backoff * (attempt + 1))
             else:
@@ -143,8 +302,6 @@ def clone_repo(
                 )
         except Exception as e:
             last_err = e
-            if os.path.exists(dest):
-                shutil.rmtree(dest, ignore_errors=True)
             if attempt < retries:
                 time.sleep(backoff * (attempt + 1))
             else:
@@ -155,27 +312,33 @@ def clone_repo(
 
 
 def build_file_tree(root_path: str) -> Dict[str, Any]:
-    root = Path(root_path)
-
-    def walk(p: Path) -> FileNode:
-        if p.is_dir():
-            if p.name in IGNORE_DIRS:
-                return None  # type: ignore
-            children: List[FileNode] = []
-            for child in sorted(
-                p.iterdir(), key=lambda x: (x.is_file(), x.name.lower())
-            ):
-                node = walk(child)
+    root = os.path.normpath(root_path)
+    # Paths are reported relative to the root; slicing off the prefix is much
+    # cheaper than Path.relative_to for every entry
+    prefix_len = len(os.path.join(root, ""))
+
+    def rel(path: str) -> str:
+        return path[prefix_len:] or "."
+
+    def walk(path: str) -> Optional[FileNode]:
+        if os.path.basename(path) in IGNORE_DIRS:
+            return None
+        # DirEntry caches the file type from the directory listing, so
+        # is_dir()/is_file() don't cost a stat per entry
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda e: (e.is_file(), e.name.lower()))
+        children: List[FileNode] = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                node = walk(entry.path)
                 if node:
                     children.append(node)
-            return FileNode(
-                path=str(p.relative_to(root)),
-                type="dir",
-                children=children,
-            )
-        else:
-            return FileNode(path=str(p.relative_to(root)), type="file")
+            elif entry.name not in IGNORE_DIRS:  # a worktree's .git is a file
+                children.append(FileNode(path=rel(entry.path), type="file"))
+        return FileNode(path=rel(path), type="dir", children=children)
 
+    if not os.path.isdir(root):
+        return FileNode(path=".", type="file").to_dict()
     tree = walk(root)
     return tree.to_dict() if tree else {}
 
@@ -196,19 +359,48 @@ def summarize_readme(text: str, max_len: int = 500) -> str:
     return summarize_readme_llm(text, max_len)
 
 
-def repo_map_workflow(repo_url: str) -> Dict[str, Any]:
+def summarize_readme_in_background(readme_text: str) -> Callable[[], str]:
+    """Start summarizing the README on a worker thread.
+
+    Returns a function that waits for the summary (up to SUMMARY_TIMEOUT)
+    and falls back to the plain truncated text if it isn't ready, so
+    callers can do other work while the LLM call is in flight.
+    """
+    pool = ThreadPoolExecutor(max_workers=1)
+    future = pool.submit(summarize_readme, readme_text)
+    # The submitted call still runs; we just never block on a stuck one
+    pool.shutdown(wait=False)
+
+    def wait() -> str:
+        try:
+            return future.result(timeout=SUMMARY_TIMEOUT)
+        except Exception:
+            return _fallback(readme_text, 500)
+
+    return wait
+
+
+def repo_map_workflow(repo_url: str, summarize: bool = True) -> Dict[str, Any]:
     """Clone the repo and bundle up what we need: file tree, README summary,
-    and any likely entry-point files. Returns an error field on failure."""
+    and any likely entry-point files. Returns an error field on failure.
+
+    With summarize=False the summary is left to the caller (readme_summary
+    is None; the raw README comes back as readme_text), e.g. to run it
+    alongside code analysis with summarize_readme_in_background.
+    """
     try:
         path = clone_repo(repo_url)
-        file_tree = build_file_tree(path)
         readme_text = read_readme(path) or ""
-        summary = summarize_readme(readme_text)
+        # The summary is usually a network round trip; start it first and
+        # map the tree while it's in flight
+        wait_for_summary = summarize_readme_in_background(readme_text) if summarize else None
+        file_tree = build_file_tree(path)
         priority_files = find_important_files(file_tree)
         return {
             "repo_path": path,
             "file_tree": file_tree,
-            "readme_summary": summary,
+            "readme_text": readme_text,
+            "readme_summary": wait_for_summary() if wait_for_summary else None,
             "priority_files": priority_files,
             "error": None,
         }
@@ -216,39 +408,46 @@ def repo_map_workflow(repo_url: str) -> Dict[str, Any]:
         return {
             "repo_path": "",
             "file_tree": {},
+            "readme_text": "",
             "readme_summary": "",
             "priority_files": [],
             "error": f"repo_map_failed: {e}",
         }
 
 
-def find_important_files(file_tree: Dict[str, Any]) -> List[str]:
-    """Pick out the files most likely to be entry points (main.py, app.py, etc.)."""
+def find_important_files(
+    file_tree: Dict[str, Any],
+    max_depth: int = 3,
+    limit: int = 10,
+    priority: frozenset = PRIORITY_FILES,
+    ignore_dirs: frozenset = IGNORE_DIRS,
+) -> List[str]:
+    """Pick out the files most likely to be entry points (main.py, app.py, etc.).
+
+    Searches breadth-first, so the shallowest matches win, and stops after
+    `limit` hits. Directories named in `ignore_dirs` and anything deeper
+    than `max_depth` levels below the root are never visited.
+    """
     important = []
-    priority_names = {
-        "main.py",
-        "app.py",
-        "__main__.py",
-        "__init__.py",
-        "cli.py",
-        "server.py",
-        "run.py",
-        "manage.py",
-    }
-
-    def search(tree: Dict[str, Any]) -> None:
+    queue = deque([(file_tree, 0)])
+    while queue:
+        tree, depth = queue.popleft()
         if not tree:
-            return
+            continue
         if tree.get("type") == "file":
             path = tree.get("path", "")
-            fname = Path(path).name
-            if fname in priority_names:
+            if os.path.basename(path) in priority:
                 important.append(path)
-        if tree.get("children"):
-            for child in tree["children"]:
-                search(child)
+                if len(important) >= limit:
+                    break
+            continue
+        if depth >= max_depth:
+            continue
+        for child in tree.get("children") or []:
+            if child.get("type") == "dir" and os.path.basename(child.get("path", "")) in ignore_dirs:
+                continue
+            queue.append((child, depth + 1))
 
-    search(file_tree)
     return important
 
 
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 """Generate a sample documentation deliverable for a popular Python repository."""
+import argparse
 import os
 import sys
 
@@ -38,8 +39,6 @@ def generate_sample_docs(repo_url: str, output_name: str = "sample_output"):
 
 
 if __name__ == "__main__":
-    import argparse
-    
     parser = argparse.ArgumentParser(
         description="Generate sample documentation for a GitHub repository"
     )
@@ -7,8 +7,7 @@ from codebase_genius import load_env
 load_env()
 
 # Set default environment variables if not already set
-if not os.getenv('USE_LLM'):
-    os.environ['USE_LLM'] = 'true'
+os.environ.setdefault('USE_LLM', 'true')
 
 # Check if API key is set
 if not os.getenv('GEMINI_API_KEY'):
@@ -16,11 +15,14 @@ if not os.getenv('GEMINI_API_KEY'):
     print("   To enable them, drop a key in your .env file (see .env.example).")
 
 import uvicorn
-from codebase_genius.api_server import app
 
 if __name__ == "__main__":
     # Support PORT environment variable for deployment platforms
     port = int(os.getenv('PORT', sys.argv[1] if len(sys.argv) > 1 else 8000))
+    # Server processes answering requests. Each one has its own pool of
+    # CODEBASE_GENIUS_WORKERS for /generate, so keep the product near the
+    # number of cores.
+    workers = int(os.getenv('WEB_CONCURRENCY', '1'))
     
     print("=" * 70)
     print("🧠 CODEBASE GENIUS API SERVER")
@@ -29,14 +31,18 @@ if __name__ == "__main__":
     print(f"🎨 Web UI:    http://0.0.0.0:{port}/gui")
     print(f"📊 API docs:  http://0.0.0.0:{port}/docs")
     print(f"❤️  Health:    http://0.0.0.0:{port}/health")
+    if workers > 1:
+        print(f"🧵 Workers:   {workers}")
     print("\nPress CTRL+C any time to stop the server\n")
     print("=" * 70)
     
     try:
+        # Passed as an import string so uvicorn can load it in each worker
         uvicorn.run(
-            app,
+            "codebase_genius.api_server:app",
             host="0.0.0.0",
             port=port,
+            workers=workers,
             log_level="info"
         )
     except KeyboardInterrupt: